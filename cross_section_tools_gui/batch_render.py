@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import data_cache
+import smoothing
+import plot_style
+from binary_store import find_energy_dirs
+
+# Headless rendering of the cross_section_viewer_gui.py figure for every
+# (process, energy, final state, parameter set) on the Agg backend, fanned out over
+# worker processes. A manifest in the output folder stores a signature of each figure's
+# inputs (channel file stamps and render options), so reruns only redraw what changed.
+# The manifest is saved during the run and on exit, so an interrupted run keeps its progress.
+#
+#   python batch_render.py [root] [--out saved_graphs] [--log-y] [--trend-only] [--workers 8]
+
+MANIFEST_NAME = ".render_manifest.json"
+MANIFEST_SAVE_INTERVAL = 5.0  # seconds between manifest saves during a run
+FINAL_STATES = ["2X", "3X", "4X"]
+
+# === 1. Figures ===
+def find_figures(root, processes, energies):
+    figures = []
+    for energy_dir in find_energy_dirs(root):
+        process = os.path.basename(os.path.dirname(energy_dir))
+        energy = os.path.basename(energy_dir)
+        if (processes and process not in processes) or (energies and energy not in energies):
+            continue
+        for state in FINAL_STATES:
+            state_dir = os.path.join(energy_dir, state)
+            if not os.path.isdir(state_dir):
+                continue
+            for folder in sorted(e.name for e in os.scandir(state_dir) if e.is_dir()):
+                folder_dir = os.path.join(state_dir, folder)
+                paths = sorted(e.path for e in os.scandir(folder_dir) if e.name.endswith(".txt") and e.is_file())
+                if paths:
+                    figures.append((process, energy, state, folder, paths))
+    return figures
+
+def figure_signature(paths, options):
+    h = hashlib.sha1(json.dumps(options, sort_keys=True).encode())
+    for path in paths:
+        mtime_ns, size = data_cache.file_stamp(path)
+        h.update(f"{os.path.basename(path)}|{mtime_ns}|{size}".encode())
+    return h.hexdigest()
+
+def render_figure(energy, folder, paths, out_path, options):
+    fig = Figure(figsize=options["size"])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+
+    x_min, x_max = options["x_min"], options["x_max"]
+    for path in paths:
+        try:
+            x, y = data_cache.load_xy(path)
+        except (OSError, ValueError):
+            continue
+        mask = np.ones_like(x, dtype=bool)
+        if x_min is not None: mask &= (x >= x_min)
+        if x_max is not None: mask &= (x <= x_max)
+        x, y = x[mask], y[mask]
+        if options["trend_only"]:
+            x, y = smoothing.smooth("LOWESS", x, y, frac=options["frac"])
+        plot_style.plot_viewer_curve(ax, x, y, plot_style.beautify_filename(os.path.basename(path)), options["trend_only"])
+
+    plot_style.style_viewer_axes(ax, plot_style.viewer_title(energy, folder), options["log_x"], options["log_y"])
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    fig.savefig(out_path, dpi=options["dpi"])
+    return out_path
+
+# === 2. Manifest ===
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+# === 3. Command line ===
+def main(argv=None):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Render the viewer figure of every parameter set to PNG without a display.")
+    parser.add_argument("root", nargs="?", default=script_dir,
+                        help="folder containing the process directories (default: next to this script)")
+    parser.add_argument("--out", default=os.path.join(script_dir, "saved_graphs"), help="output folder")
+    parser.add_argument("--process", action="append", help="only this process type (repeatable)")
+    parser.add_argument("--energy", action="append", help="only this energy in TeV (repeatable)")
+    parser.add_argument("--log-x", action="store_true", help="logarithmic X axis")
+    parser.add_argument("--log-y", action="store_true", help="logarithmic Y axis")
+    parser.add_argument("--trend-only", action="store_true", help="draw LOWESS trends instead of the data points")
+    parser.add_argument("--frac", type=float, default=0.15, help="LOWESS frac (with --trend-only)")
+    parser.add_argument("--x-min", type=float, help="lower X limit of the plotted data")
+    parser.add_argument("--x-max", type=float, help="upper X limit of the plotted data")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--size", type=float, nargs=2, default=[16.0, 9.0], metavar=("W", "H"), help="figure size in inches")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--force", action="store_true", help="render all figures even if their inputs did not change")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.root):
+        parser.error(f"not a directory: {args.root}")
+
+    options = {"log_x": args.log_x, "log_y": args.log_y, "trend_only": args.trend_only, "frac": args.frac,
+               "x_min": args.x_min, "x_max": args.x_max, "dpi": args.dpi, "size": list(args.size)}
+    manifest = load_manifest(args.out)
+
+    pending = []
+    figures = find_figures(args.root, args.process, args.energy)
+    for process, energy, state, folder, paths in figures:
+        key = "/".join([process, energy, state, f"{folder}.png"])
+        out_path = os.path.join(args.out, *key.split("/"))
+        signature = figure_signature(paths, options)
+        if not args.force and manifest.get(key) == signature and os.path.exists(out_path):
+            continue
+        pending.append((key, signature, energy, folder, paths, out_path))
+
+    print(f"{len(figures)} figures, {len(figures) - len(pending)} up to date, {len(pending)} to render")
+    if not pending:
+        return 0
+
+    started = time.perf_counter()
+    last_save = started
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = {pool.submit(render_figure, energy, folder, paths, out_path, options): (key, signature)
+                       for key, signature, energy, folder, paths, out_path in pending}
+            for done, future in enumerate(as_completed(futures), start=1):
+                key, signature = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"[{done}/{len(pending)}] {key}: failed ({e})")
+                    continue
+                manifest[key] = signature
+                print(f"[{done}/{len(pending)}] {key}")
+                # Record finished figures as we go, so an interrupted run does not redraw them
+                if time.perf_counter() - last_save > MANIFEST_SAVE_INTERVAL:
+                    save_manifest(args.out, manifest)
+                    last_save = time.perf_counter()
+    finally:
+        save_manifest(args.out, manifest)
+    print(f"Rendered {len(pending) - failed} figures in {time.perf_counter() - started:.2f} s, {failed} failed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import sum_store
+from binary_store import find_energy_dirs
+
+# Headless regeneration of every Sum/<folder>.txt (same summation as sum_and_plot_gui.py).
+# Never imports tkinter, so it runs on compute nodes without a display.
+#
+#   python batch_sum.py [root] [--process "pair production"] [--energy 14] [--workers 8] [--force]
+
+# === 1. Work items ===
+def find_parameter_sets(energy_dir):
+    names = set()
+    for state in sum_store.FINAL_STATES:
+        state_dir = os.path.join(energy_dir, state)
+        if os.path.isdir(state_dir):
+            names.update(e.name for e in os.scandir(state_dir) if e.is_dir())
+    return sorted(names)
+
+def make_tasks(root, processes, energies, chunk_size):
+    tasks = []
+    for energy_dir in find_energy_dirs(root):
+        process = os.path.basename(os.path.dirname(energy_dir))
+        energy = os.path.basename(energy_dir)
+        if processes and process not in processes:
+            continue
+        if energies and energy not in energies:
+            continue
+        names = find_parameter_sets(energy_dir)
+        # Several parameter sets per task so each worker still gets a batched summation
+        for start in range(0, len(names), chunk_size):
+            tasks.append((energy_dir, names[start:start + chunk_size]))
+    return tasks
+
+def run_task(energy_dir, names, x_min, x_max, force):
+    started = time.perf_counter()
+    jobs = [(name, sum_store.get_sum_path(energy_dir, name), sum_store.find_channel_paths(energy_dir, name))
+            for name in names]
+    rebuilt = sum_store.update_sums(jobs, x_min, x_max, force=force)
+    return len(rebuilt), len(names) - len(rebuilt), time.perf_counter() - started
+
+# === 2. Command line ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute Sum/<parameter set>.txt for every process, energy and parameter set.")
+    parser.add_argument("root", nargs="?", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="folder containing the process directories (default: next to this script)")
+    parser.add_argument("--process", action="append", help="only this process type (repeatable)")
+    parser.add_argument("--energy", action="append", help="only this energy in TeV (repeatable)")
+    parser.add_argument("--x-min", type=float, help="fixed lower end of the summation grid")
+    parser.add_argument("--x-max", type=float, help="fixed upper end of the summation grid")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunk-size", type=int, default=8, help="parameter sets per task")
+    parser.add_argument("--force", action="store_true", help="rebuild sums even if they are up to date")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.root):
+        parser.error(f"not a directory: {args.root}")
+
+    tasks = make_tasks(args.root, args.process, args.energy, max(1, args.chunk_size))
+    if not tasks:
+        print(f"No parameter sets found under {args.root}")
+        return 1
+
+    started = time.perf_counter()
+    total_rebuilt = total_current = failed = 0
+    busy_time = 0.0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(run_task, energy_dir, names, args.x_min, args.x_max, args.force): (energy_dir, names)
+                   for energy_dir, names in tasks}
+        for done, future in enumerate(as_completed(futures), start=1):
+            energy_dir, names = futures[future]
+            label = os.path.relpath(energy_dir, args.root)
+            try:
+                rebuilt, current, elapsed = future.result()
+            except Exception as e:
+                failed += len(names)
+                print(f"[{done}/{len(tasks)}] {label}: failed ({e})")
+                continue
+            total_rebuilt += rebuilt
+            total_current += current
+            busy_time += elapsed
+            print(f"[{done}/{len(tasks)}] {label}: {rebuilt} rebuilt, {current} up to date ({elapsed:.2f} s)")
+
+    wall_time = time.perf_counter() - started
+    print(f"Done: {total_rebuilt} rebuilt, {total_current} up to date or empty, {failed} failed "
+          f"in {wall_time:.2f} s wall time ({busy_time:.2f} s of worker time)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+# Compiled copy of the <process>/<energy>/<final state>/<M_r_sin_Lambda>/*.txt tree.
+# Each process/energy folder gets a ".store" directory with one (2, N) float64 block
+# (row 0 = mass, row 1 = cross section) and a JSON index of channel offsets.
+# Every build writes a new, uniquely named block and the index names the block it belongs
+# to, so replacing index.json switches both at once: a reader never pairs a new block with
+# an old index or the other way round.
+
+STORE_DIR = ".store"
+BLOCK_FILE = "columns.npy"  # stores written before the index named its block
+INDEX_FILE = "index.json"
+FINAL_STATES = ["2X", "3X", "4X"]
+
+_open_stores = {}
+
+# === 1. Reading ===
+def open_store(energy_dir):
+    store_dir = os.path.join(energy_dir, STORE_DIR)
+    index_path = os.path.join(store_dir, INDEX_FILE)
+    try:
+        index_mtime = os.stat(index_path).st_mtime_ns
+    except OSError:
+        _open_stores.pop(store_dir, None)
+        return None
+
+    cached = _open_stores.get(store_dir)
+    if cached is not None and cached[0] == index_mtime:
+        return cached[1], cached[2]
+
+    try:
+        with open(index_path, "r") as f:
+            data = json.load(f)
+        index = data["entries"]
+        block = np.load(os.path.join(store_dir, data.get("block", BLOCK_FILE)), mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        _open_stores.pop(store_dir, None)
+        return None
+
+    _open_stores[store_dir] = (index_mtime, block, index)
+    return block, index
+
+def lookup(path, stamp):
+    # path = <energy_dir>/<final state>/<folder>/<channel>.txt
+    folder_dir = os.path.dirname(path)
+    state_dir = os.path.dirname(folder_dir)
+    energy_dir = os.path.dirname(state_dir)
+    store = open_store(energy_dir)
+    if store is None:
+        return None
+
+    block, index = store
+    key = "/".join([os.path.basename(state_dir), os.path.basename(folder_dir), os.path.basename(path)])
+    entry = index.get(key)
+    if entry is None:
+        return None
+    offset, length, mtime_ns, size = entry
+    if (mtime_ns, size) != tuple(stamp):
+        return None  # text file changed after the store was built
+    return block[0, offset:offset + length], block[1, offset:offset + length]
+
+# === 2. Conversion ===
+def build_store(energy_dir, log=print):
+    from data_cache import read_xy, file_stamp
+
+    masses, cross_sections, index = [], [], {}
+    offset = 0
+    for state in FINAL_STATES:
+        state_dir = os.path.join(energy_dir, state)
+        if not os.path.isdir(state_dir):
+            continue
+        for folder in sorted(e.name for e in os.scandir(state_dir) if e.is_dir()):
+            folder_dir = os.path.join(state_dir, folder)
+            for name in sorted(e.name for e in os.scandir(folder_dir) if e.is_file() and e.name.endswith(".txt")):
+                path = os.path.join(folder_dir, name)
+                try:
+                    stamp = file_stamp(path)
+                    mass, cross_section = read_xy(path)
+                except (OSError, ValueError) as e:
+                    log(f"Skipping {path}: {e}")
+                    continue
+                masses.append(mass)
+                cross_sections.append(cross_section)
+                index[f"{state}/{folder}/{name}"] = [offset, len(mass), stamp[0], stamp[1]]
+                offset += len(mass)
+
+    if not index:
+        return 0
+
+    store_dir = os.path.join(energy_dir, STORE_DIR)
+    os.makedirs(store_dir, exist_ok=True)
+    block = np.vstack([np.concatenate(masses), np.concatenate(cross_sections)])
+
+    # The new block goes next to the old one; replacing the index is the only switch
+    block_name = f"columns-{time.time_ns():x}-{os.getpid()}.npy"
+    with open(os.path.join(store_dir, block_name), "wb") as f:
+        np.save(f, block)
+
+    index_tmp = os.path.join(store_dir, INDEX_FILE + ".tmp")
+    with open(index_tmp, "w") as f:
+        json.dump({"version": 2, "block": block_name, "entries": index}, f)
+    os.replace(index_tmp, os.path.join(store_dir, INDEX_FILE))
+
+    _open_stores.pop(store_dir, None)
+    for name in os.listdir(store_dir):
+        if name.startswith("columns") and name != block_name:
+            try:
+                os.remove(os.path.join(store_dir, name))
+            except OSError:
+                pass  # still mapped by a reader (Windows): removed by the next build
+    return len(index)
+
+def find_energy_dirs(root):
+    energy_dirs = []
+    for process in sorted(e.path for e in os.scandir(root) if e.is_dir() and not e.name.startswith(".")):
+        for energy in sorted(e.path for e in os.scandir(process) if e.is_dir()):
+            if any(os.path.isdir(os.path.join(energy, state)) for state in FINAL_STATES):
+                energy_dirs.append(energy)
+    return energy_dirs
+
+# === 3. Command line ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build memory-mappable stores from the cross-section text tree.")
+    parser.add_argument("root", nargs="?", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="folder containing the process directories (default: next to this script)")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.root):
+        parser.error(f"not a directory: {args.root}")
+
+    energy_dirs = find_energy_dirs(args.root)
+    if not energy_dirs:
+        print(f"No <process>/<energy>/<2X|3X|4X> folders found under {args.root}")
+        return 1
+    for energy_dir in energy_dirs:
+        count = build_store(energy_dir)
+        print(f"{os.path.relpath(energy_dir, args.root)}: {count} channel files")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+# Runs loading, summation and smoothing jobs off the Tk thread.
+# Jobs are submitted under a channel name (e.g. "plot"); a newer job on the same channel
+# cancels the previous one if it has not started yet and makes its result stale otherwise,
+# so only the newest request for a channel is ever delivered.
+# Results are handed back to the Tk thread through root.after(), never from the worker.
+
+class ComputeWorker:
+    def __init__(self, root, max_workers=1, poll_ms=25):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="compute")
+        self.results = queue.Queue()
+        self.generations = {}
+        self.pending = {}
+        self.polling = False
+
+    def submit(self, channel, job, on_done, on_error=None):
+        generation = self.generations.get(channel, 0) + 1
+        self.generations[channel] = generation
+
+        previous = self.pending.get(channel)
+        if previous is not None:
+            previous.cancel()
+
+        future = self.executor.submit(job)
+        self.pending[channel] = future
+        future.add_done_callback(lambda f: self.results.put((channel, generation, f, on_done, on_error)))
+
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self.poll)
+        return generation
+
+    def is_current(self, channel, generation):
+        return self.generations.get(channel) == generation
+
+    def poll(self):
+        while True:
+            try:
+                channel, generation, future, on_done, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if future.cancelled() or not self.is_current(channel, generation):
+                continue
+            self.pending.pop(channel, None)
+
+            try:
+                error = future.exception()
+                if error is None:
+                    on_done(future.result())
+                elif on_error is not None:
+                    on_error(error)
+                else:
+                    raise error
+            except Exception as e:
+                # Keep polling alive even if a drawing callback fails
+                self.root.report_callback_exception(type(e), e, e.__traceback__)
+
+        if self.pending:
+            self.root.after(self.poll_ms, self.poll)
+        else:
+            self.polling = False
+
+    def shutdown(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
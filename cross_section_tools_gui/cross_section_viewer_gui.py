@@ -1,13 +1,20 @@
 import tkinter as tk
 from tkinter import messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
-from statsmodels.nonparametric.smoothers_lowess import lowess
-from matplotlib.ticker import ScalarFormatter
 import numpy as np
-import shutil
+import data_cache
+import data_index
+import smoothing
+import summation
+import plot_style
+import lod
+from point_drag import BlitDragger
+from compute_worker import ComputeWorker
+from edit_journal import JournalManager
+
+SUM_KEY = "sum"
 
 class MultiGraphApp:
 # === 1. Initialization ===
@@ -41,7 +48,12 @@ class MultiGraphApp:
 
         self.last_selected_folder = None
         self.dragging_point = None
+        self.lines = {}
         self.active_line_data = {}
+        self.data_index = data_index.DataIndex(os.path.dirname(os.path.abspath(__file__)))
+        self.worker = ComputeWorker(root)
+        self.journals = JournalManager(root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.build_interface()
 
@@ -84,11 +96,17 @@ class MultiGraphApp:
             rb.pack(anchor="w")
 
         # Axis controls
-        tk.Checkbutton(left, text="Logarithmic X", variable=self.log_x, command=self.update_plot).pack(anchor="w", pady=(10, 0))
-        tk.Checkbutton(left, text="Logarithmic Y", variable=self.log_y, command=self.update_plot).pack(anchor="w")
+        tk.Checkbutton(left, text="Logarithmic X", variable=self.log_x, command=self.update_scales).pack(anchor="w", pady=(10, 0))
+        tk.Checkbutton(left, text="Logarithmic Y", variable=self.log_y, command=self.update_scales).pack(anchor="w")
         tk.Checkbutton(left, text="Show LOWESS Only", variable=self.trend_only, command=self.update_plot).pack(anchor="w")
 
-        tk.Checkbutton(left, text="Point Edit Mode", variable=self.edit_mode, command=self.update_plot).pack(anchor="w", pady=(10, 0))
+        tk.Checkbutton(left, text="Point Edit Mode", variable=self.edit_mode, command=self.update_edit_mode).pack(anchor="w", pady=(10, 0))
+        edit_frame = tk.Frame(left)
+        edit_frame.pack(anchor="w")
+        tk.Button(edit_frame, text="Undo", command=self.undo_edit).pack(side="left")
+        tk.Button(edit_frame, text="Redo", command=self.redo_edit).pack(side="left")
+        self.root.bind("<Control-z>", lambda event: self.undo_edit())
+        self.root.bind("<Control-y>", lambda event: self.redo_edit())
 
         # LOWESS
         tk.Label(left, text="LOWESS frac:").pack(anchor="w", pady=(10, 0))
@@ -131,6 +149,10 @@ class MultiGraphApp:
         self.fig, self.ax = plt.subplots()
         self.canvas = FigureCanvasTkAgg(self.fig, master=right)
         self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.dragger = BlitDragger(self.canvas, self.ax)
+        plot_style.setup_viewer_axes(self.ax)
+        plot_style.set_viewer_scales(self.ax, self.log_x.get(), self.log_y.get())
+        self.lod = lod.LodLines(self.ax)
 
         self.canvas.mpl_connect('button_press_event', self.on_press)
         self.canvas.mpl_connect('motion_notify_event', self.on_motion)
@@ -152,32 +174,16 @@ class MultiGraphApp:
                 rb.pack(anchor="w")
         self.refresh_folders()
 
-    def build_base_path(self, final_state=None):
-        final_state = final_state or self.final_state_choice.get()
-        return os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            self.process_type.get(),
-            self.energy_choice.get(),
-            final_state
-        )
+    def active_final_states(self):
+        if self.sum_mode.get():
+            return [final_state for final_state, var in self.selected_final_states.items() if var.get()]
+        return [self.final_state_choice.get()]
 
     def refresh_folders(self):
         for widget in self.folders_panel.winfo_children():
             widget.destroy()
 
-        folders = set()
-        if self.sum_mode.get():
-            for final_state, var in self.selected_final_states.items():
-                if var.get():
-                    base_path = self.build_base_path(final_state)
-                    if os.path.exists(base_path):
-                        folders.update(d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d)))
-        else:
-            base_path = self.build_base_path()
-            if os.path.exists(base_path):
-                folders = set(d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d)))
-
-        folders = sorted(folders)
+        folders = self.data_index.parameter_sets(self.process_type.get(), self.energy_choice.get(), self.active_final_states())
         if self.last_selected_folder not in folders:
             self.selected_folder.set(folders[0] if folders else "")
         else:
@@ -190,20 +196,13 @@ class MultiGraphApp:
 
     def collect_files(self):
         result = {}
-        if self.sum_mode.get():
-            for final_state, var in self.selected_final_states.items():
-                if var.get():
-                    folder_path = os.path.join(self.build_base_path(final_state), self.selected_folder.get())
-                    if os.path.exists(folder_path):
-                        for file in os.listdir(folder_path):
-                            if file.endswith(".txt"):
-                                result[(final_state, file)] = os.path.join(folder_path, file)
-        else:
-            folder_path = os.path.join(self.build_base_path(), self.selected_folder.get())
-            if os.path.exists(folder_path):
-                for file in os.listdir(folder_path):
-                    if file.endswith(".txt"):
-                        result[(self.final_state_choice.get(), file)] = os.path.join(folder_path, file)
+        folder = self.selected_folder.get()
+        if not folder:
+            return result
+        for final_state in self.active_final_states():
+            files = self.data_index.channel_files(self.process_type.get(), self.energy_choice.get(), final_state, folder)
+            for file, path in files.items():
+                result[(final_state, file)] = path
         return result
 
     def load_graphs_from_folder(self):
@@ -216,169 +215,188 @@ class MultiGraphApp:
         for (final_state, filename) in sorted(paths.keys()):
             var = tk.BooleanVar(value=True)
             self.available_graphs[filename] = var
-            tk.Checkbutton(self.graphs_panel, text=filename.replace(".txt", ""), variable=var, command=self.update_plot).pack(anchor="w")
+            tk.Checkbutton(self.graphs_panel, text=filename.replace(".txt", ""), variable=var, command=self.update_graph).pack(anchor="w")
 
-        self.auto_set_mass_range()
+        self.journals.open(paths.values())
+        self.auto_set_mass_range(paths)
         self.update_plot()
 
-    def auto_set_mass_range(self):
+    def auto_set_mass_range(self, paths=None):
         all_masses = []
-        paths = self.collect_files()
+        if paths is None:
+            paths = self.collect_files()
         for (final_state, filename), path in paths.items():
-            if self.available_graphs.get(filename, tk.BooleanVar(value=True)).get():
+            if self.is_selected(filename):
                 try:
-                    df = pd.read_csv(path, delim_whitespace=True, header=None)
-                    df.columns = ['Mass', 'CrossSection']
-                    all_masses.extend(df['Mass'].values)
+                    mass, _ = data_cache.load_xy(path)
+                    if len(mass):
+                        all_masses.append(mass)
                 except:
                     continue
         if all_masses:
+            all_masses = np.concatenate(all_masses)
             if not self.fix_x_min.get():
-                self.x_min.set(min(all_masses))
+                self.x_min.set(float(all_masses.min()))
             if not self.fix_x_max.get():
-                self.x_max.set(max(all_masses))
+                self.x_max.set(float(all_masses.max()))
+
+    def is_selected(self, filename):
+        var = self.available_graphs.get(filename)
+        return var is None or var.get()
 
     def beautify_filename(self, filename):
-        name = filename.replace(".txt", "")
-        latex_names = {
-            "phi": r"\phi", "phia": r"\phi_{a}", "phib": r"\phi_{b}",
-            "phia_conj": r"\phi_{a}^{*}", "phib_conj": r"\phi_{b}^{*}",
-            "psi": r"\psi", "psia": r"\psi_{a}", "psib": r"\psi_{b}",
-            "psia_conj": r"\psi_{a}^{*}", "psib_conj": r"\psi_{b}^{*}",
-        }
-        latex_parts = [latex_names.get(part, part) for part in name.split("_")]
-        return r"$" + r" \, ".join(latex_parts) + r"$"
+        return plot_style.beautify_filename(filename)
 
 # === 4. Plotting ===
+    # Lines are kept between updates, keyed by (final state, channel) or SUM_KEY. Data, markers
+    # and visibility change in place; the lines are rebuilt only when the set of curves changes.
     def update_plot(self, *_):
-        self.ax.clear()
-        self.active_line_data.clear()
+        # Snapshot the Tk state here; loading and fitting run on the compute worker.
+        # Without summation every channel is computed, so unticking one only hides its line.
+        sum_mode = self.sum_mode.get()
+        selected = [(final_state, filename, path) for (final_state, filename), path in self.collect_files().items()
+                    if not sum_mode or self.is_selected(filename)]
+        settings = {
+            'x_min': self.x_min.get() if self.fix_x_min.get() else None,
+            'x_max': self.x_max.get() if self.fix_x_max.get() else None,
+            'sum_mode': sum_mode,
+            'trend_only': self.trend_only.get(),
+            'frac': self.frac.get(),
+        }
+        self.worker.submit("plot", lambda: self.compute_curves(selected, settings), self.draw_curves)
 
-        folder_paths = self.collect_files()
+    def compute_curves(self, selected, settings):
         data = []
-
-        for (final_state, filename), path in folder_paths.items():
-            if not self.available_graphs.get(filename, tk.BooleanVar(value=True)).get():
-                continue
+        for final_state, filename, path in selected:
             try:
-                df = pd.read_csv(path, delim_whitespace=True, header=None)
-                df.columns = ['Mass', 'CrossSection']
-                data.append((final_state, filename, df, path))
+                x, y = data_cache.load_xy(path)
+                data.append((final_state, filename, x, y, path))
             except:
                 continue
 
+        curves = []
         if not data:
-            self.canvas.draw()
-            return
+            return curves
 
-        x_min = self.x_min.get() if self.fix_x_min.get() else None
-        x_max = self.x_max.get() if self.fix_x_max.get() else None
+        x_min, x_max = settings['x_min'], settings['x_max']
 
-        if self.sum_mode.get():
-            masses = sorted(set(np.concatenate([df['Mass'].values for (_, _, df, _) in data])))
-            sum_y = np.zeros_like(masses, dtype=float)
-
-            for (_, _, df, _) in data:
-                interp_y = np.interp(masses, df['Mass'].values, df['CrossSection'].values)
-                sum_y += interp_y
-
-            x, y = np.array(masses), sum_y
+        if settings['sum_mode']:
+            x, y = summation.sum_channels([(x, y) for (_, _, x, y, _) in data])
             mask = np.ones_like(x, dtype=bool)
             if x_min is not None: mask &= (x >= x_min)
             if x_max is not None: mask &= (x <= x_max)
 
             x, y = x[mask], y[mask]
-            if self.trend_only.get():
-                x_s, y_s = lowess(y, x, frac=self.frac.get(), return_sorted=True).T
-                self.ax.plot(x_s, y_s, label="Total Cross Section")
-            else:
-                self.ax.plot(x, y, marker='o', linestyle='-', label="Total Cross Section")
+            if settings['trend_only']:
+                x, y = smoothing.smooth("LOWESS", x, y, frac=settings['frac'])
+            curves.append({'key': SUM_KEY, 'label': "Total Cross Section", 'x': x, 'y': y, 'smoothed': settings['trend_only'], 'info': None})
 
         else:
-            for (final_state, filename, df, path) in data:
-                x = df['Mass'].values
-                y = df['CrossSection'].values
-
+            for (final_state, filename, x, y, path) in data:
                 mask = np.ones_like(x, dtype=bool)
                 if x_min is not None: mask &= (x >= x_min)
                 if x_max is not None: mask &= (x <= x_max)
 
                 x_plot, y_plot = x[mask], y[mask]
-                label = self.beautify_filename(filename)
-
-                if self.trend_only.get():
-                    x_s, y_s = lowess(y_plot, x_plot, frac=self.frac.get(), return_sorted=True).T
-                    line, = self.ax.plot(x_s, y_s, label=label)
-                else:
-                    line, = self.ax.plot(x_plot, y_plot, marker='o', linestyle='-', label=label)
-
-                if self.edit_mode.get():
-                    self.active_line_data[line] = {
-                        'filename': filename,
-                        'final_state': final_state,
-                        'df': df,
-                        'path': path
-                    }
+                if settings['trend_only']:
+                    x_plot, y_plot = smoothing.smooth("LOWESS", x_plot, y_plot, frac=settings['frac'])
+
+                curves.append({
+                    'key': (final_state, filename),
+                    'label': self.beautify_filename(filename),
+                    'x': x_plot,
+                    'y': y_plot,
+                    'smoothed': settings['trend_only'],
+                    'info': {'filename': filename, 'final_state': final_state, 'path': path}
+                })
+        return curves
+
+    def draw_curves(self, curves):
+        self.dragging_point = None
+        self.dragger.cancel()
+
+        if [curve['key'] for curve in curves] != list(self.lines):
+            for line in self.lines.values():
+                line.remove()
+            self.lines.clear()
+            self.lod.clear()
+            self.ax.set_prop_cycle(None)
+            for curve in curves:
+                self.lines[curve['key']] = plot_style.plot_viewer_curve(self.ax, [], [], curve['label'], curve['smoothed'])
+        for curve in curves:
+            line = self.lines[curve['key']]
+            self.lod.set_data(line, curve['x'], curve['y'])
+            line.set_marker('None' if curve['smoothed'] else 'o')
+        self.active_line_data = {self.lines[curve['key']]: curve['info'] for curve in curves if curve['info'] is not None}
+
+        self.ax.set_title(plot_style.viewer_title(self.energy_choice.get(), self.selected_folder.get()), fontsize=22)
+        self.refresh_view()
+
+    def refresh_view(self):
+        for key, line in self.lines.items():
+            line.set_visible(key == SUM_KEY or self.is_selected(key[1]))
+        visible = [line for line in self.lines.values() if line.get_visible()]
+
+        self.lod.relim(visible_only=True)
+        self.ax.autoscale_view()
+        if visible:
+            self.ax.legend(handles=visible, fontsize=13)
+        elif self.ax.get_legend() is not None:
+            self.ax.get_legend().remove()
+        self.canvas.draw_idle()
+
+    def update_graph(self):
+        if self.sum_mode.get():
+            self.update_plot()  # the total itself changes
+        else:
+            self.refresh_view()
 
-        folder = self.selected_folder.get()
-        try:
-            mr, sin_theta, lam = folder.split("_")
-            title = fr"$\sqrt{{s}} = {self.energy_choice.get()}$ TeV, $M_r = {mr}$ GeV, $\sin\theta = {sin_theta}$, $\Lambda = {lam}$ GeV"
-        except ValueError:
-            title = folder
-
-        self.ax.set_title(title, fontsize=22)
-        self.ax.set_xlabel(r"$M_{\phi_b}$ [GeV]", fontsize=18)
-        self.ax.set_ylabel(r"$\sigma_\mathrm{process}$ [pb]", fontsize=18)
-        self.ax.grid(True)
-
-        formatter = ScalarFormatter(useMathText=True)
-        formatter.set_scientific(True)
-        formatter.set_powerlimits((0, 0))
-        self.ax.yaxis.set_major_formatter(formatter)
-
-        self.ax.set_xscale('log' if self.log_x.get() else 'linear')
-        self.ax.set_yscale('log' if self.log_y.get() else 'linear')
-        self.ax.legend(fontsize=13)
-        self.canvas.draw()
+    def update_scales(self):
+        plot_style.set_viewer_scales(self.ax, self.log_x.get(), self.log_y.get())
+        self.refresh_view()
 
 # === 5. Point Editing ===
     def on_press(self, event):
         if not self.edit_mode.get() or event.inaxes != self.ax:
             return
         for line, info in self.active_line_data.items():
+            if not line.get_visible():
+                continue
             contains, attr = line.contains(event)
             if contains:
                 ind = attr['ind'][0]
                 self.dragging_point = (line, ind)
+                self.dragger.start(line, ind)
                 return
 
     def on_motion(self, event):
         if not self.dragging_point or not self.edit_mode.get() or event.inaxes != self.ax:
             return
-        line, idx = self.dragging_point
-        xdata, ydata = list(line.get_xdata()), list(line.get_ydata())
-        ydata[idx] = event.ydata
-        line.set_data(xdata, ydata)
-        self.canvas.draw()
+        self.dragger.move(event.ydata)
 
     def on_release(self, event):
         if not self.dragging_point or not self.edit_mode.get():
             return
         line, idx = self.dragging_point
+        new_value = self.dragger.finish()
         info = self.active_line_data.get(line)
-        if info:
-            df = info['df']
-            path = info['path']
-            x_mass = df.iloc[idx, 0]
-            new_value = event.ydata
-            closest_idx = (df['Mass'] - x_mass).abs().idxmin()
-            df.at[closest_idx, 'CrossSection'] = new_value
-            backup_path = path + ".bak"
-            if not os.path.exists(backup_path):
-                shutil.copy2(path, backup_path)
-            df.to_csv(path, sep=' ', header=False, index=False)
+        if info and new_value is not None:
+            self.journals.record(info['path'], line.get_xdata()[idx], new_value)
+            self.lod.set_point(line, idx, new_value)
+        self.dragging_point = None
+
+    def update_edit_mode(self):
+        # The lines stay as they are; edit mode only decides whether a click picks a point
         self.dragging_point = None
+        self.dragger.cancel()
+
+    def undo_edit(self):
+        if self.journals.undo():
+            self.update_plot()
+
+    def redo_edit(self):
+        if self.journals.redo():
+            self.update_plot()
 
 # === 6. Utilities ===
     def reset_mass_range(self):
@@ -394,6 +412,11 @@ class MultiGraphApp:
         self.fig.savefig(os.path.join(save_dir, filename), dpi=300)
         messagebox.showinfo("Saved", f"Plot saved to:\n{save_dir}")
 
+    def on_close(self):
+        self.journals.flush_all()
+        self.worker.shutdown()
+        self.root.destroy()
+
 # === 7. Run Application ===
 if __name__ == "__main__":
     root = tk.Tk()
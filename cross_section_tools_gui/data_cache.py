@@ -0,0 +1,128 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import binary_store
+
+# Parsed two-column datasets shared by all GUIs.
+# Entries are stamped with (mtime, size) and re-read as soon as the file changes on disk.
+# When a compiled store (see binary_store.py) is up to date for a file, its arrays are
+# zero-copy slices of the memory-mapped block instead of freshly parsed text.
+# The cache is shared with the background compute worker, so every access holds a lock.
+# Edits that are journaled but not yet written to disk (see edit_journal.py) are applied
+# on top of the file contents by load().
+# Files written back by the GUIs (sums, flushed edits) go through write_xy: a temporary file
+# unique to the writing thread, replaced under a per-path lock, so the compute worker and
+# the Tk thread never rename each other's half-written files.
+
+DEFAULT_BUDGET_BYTES = 64 * 1024 * 1024
+
+# === 1. Parsing ===
+def read_xy(path):
+    values = pd.read_csv(path, sep=r"\s+", header=None, names=["Mass", "CrossSection"], dtype=float).to_numpy()
+    mass = np.ascontiguousarray(values[:, 0])
+    cross_section = np.ascontiguousarray(values[:, 1])
+    # Cached arrays are shared between callers, so nobody may modify them in place
+    mass.setflags(write=False)
+    cross_section.setflags(write=False)
+    return mass, cross_section
+
+def file_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+# === 2. LRU cache ===
+class DatasetCache:
+    def __init__(self, max_bytes=DEFAULT_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.RLock()
+
+    def load(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            mass, cross_section = self._load(path)
+            pending = self._pending.get(path)
+        if pending:
+            cross_section = cross_section.copy()
+            for m, value in pending.items():
+                cross_section[mass == m] = value
+            cross_section.setflags(write=False)
+        return mass, cross_section
+
+    def set_pending(self, path, edits):
+        with self._lock:
+            if edits:
+                self._pending[os.path.abspath(path)] = dict(edits)
+            else:
+                self._pending.pop(os.path.abspath(path), None)
+
+    def _load(self, path):
+        stamp = file_stamp(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == stamp:
+            self._entries.move_to_end(path)
+            return entry[1], entry[2]
+
+        stored = binary_store.lookup(path, stamp)
+        if stored is not None:
+            mass, cross_section = stored
+        else:
+            mass, cross_section = read_xy(path)
+        self._store(path, stamp, mass, cross_section)
+        return mass, cross_section
+
+    def _store(self, path, stamp, mass, cross_section):
+        self._drop(path)
+        self._entries[path] = (stamp, mass, cross_section)
+        self.used_bytes += mass.nbytes + cross_section.nbytes
+        while self.used_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.used_bytes -= entry[1].nbytes + entry[2].nbytes
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self.used_bytes = 0
+            else:
+                self._drop(os.path.abspath(path))
+
+# === 3. Shared instance ===
+_cache = DatasetCache()
+
+def load_xy(path):
+    return _cache.load(path)
+
+def invalidate(path=None):
+    _cache.invalidate(path)
+
+def set_pending(path, edits):
+    _cache.set_pending(path, edits)
+
+# === 4. Writing ===
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+def write_lock(path):
+    # Held while a file is written (or read, modified and written) by this process
+    with _write_locks_guard:
+        return _write_locks.setdefault(os.path.abspath(path), threading.RLock())
+
+def temp_path(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def write_xy(path, mass, cross_section):
+    with write_lock(path):
+        tmp_path = temp_path(path)
+        pd.DataFrame({'Mass': mass, 'CrossSection': cross_section}).to_csv(tmp_path, sep=' ', header=False, index=False)
+        os.replace(tmp_path, path)
+        invalidate(path)
@@ -0,0 +1,87 @@
+import os
+import json
+
+# Manifest of the data tree: names of the sub-folders and .txt files of every directory
+# the GUIs have looked at. A directory is rescanned only when its own mtime changes, so
+# switching process or energy costs one stat per directory instead of a listdir + isdir
+# per entry. The manifest is kept next to the data between sessions. It only records
+# which files exist; their contents are stamped by data_cache.py when they are read.
+
+MANIFEST_NAME = ".data_index.json"
+MANIFEST_VERSION = 2
+
+class DataIndex:
+# === 1. Initialization ===
+    def __init__(self, root, manifest_name=MANIFEST_NAME):
+        self.root = os.path.abspath(root)
+        self.manifest_path = os.path.join(self.root, manifest_name)
+        self.dirs = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.dirs = manifest["dirs"]
+        except (OSError, ValueError, KeyError):
+            self.dirs = {}
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.manifest_path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"version": MANIFEST_VERSION, "dirs": self.dirs}, f)
+            os.replace(tmp_path, self.manifest_path)
+            self.dirty = False
+        except OSError:
+            pass  # read-only data location: keep working from memory
+
+# === 2. Directory scanning ===
+    def listing(self, *parts):
+        rel = "/".join(parts)
+        path = os.path.join(self.root, *parts)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            if self.dirs.pop(rel, None) is not None:
+                self.dirty = True
+            return None
+
+        record = self.dirs.get(rel)
+        if record is not None and record["mtime"] == mtime:
+            return record
+
+        subdirs, files = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif entry.name.endswith(".txt") and entry.is_file():
+                    files.append(entry.name)
+        record = {"mtime": mtime, "subdirs": sorted(subdirs), "files": sorted(files)}
+        self.dirs[rel] = record
+        self.dirty = True
+        return record
+
+# === 3. Queries ===
+    def parameter_sets(self, process, energy, final_states):
+        names = set()
+        for state in final_states:
+            record = self.listing(process, energy, state)
+            if record is not None:
+                names.update(record["subdirs"])
+        self.save()
+        return sorted(names)
+
+    def channel_files(self, process, energy, final_state, folder):
+        record = self.listing(process, energy, final_state, folder)
+        self.save()
+        if record is None:
+            return {}
+        base_path = os.path.join(self.root, process, energy, final_state, folder)
+        return {name: os.path.join(base_path, name) for name in record["files"]}
+
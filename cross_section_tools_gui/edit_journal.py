@@ -0,0 +1,192 @@
+import os
+import json
+import shutil
+import numpy as np
+import data_cache
+
+# Point edits are appended to a "<file>.journal" sidecar (one JSON record per line) and
+# only written into the data file in batches: after a short idle period or on exit.
+# The data file is replaced atomically (temporary file + os.replace), and the .bak copy
+# is still made before the first change. Until a flush, data_cache serves the file with
+# the pending edits applied, so redraws already show them.
+# The journal also keeps the full edit history for multi-level undo/redo, across sessions.
+
+JOURNAL_SUFFIX = ".journal"
+MAX_HISTORY = 500
+
+# === 1. Journal of a single data file ===
+class EditJournal:
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.journal_path = self.path + JOURNAL_SUFFIX
+        self.undo_stack = []
+        self.redo_stack = []
+        self.pending = {}
+        self.replay()
+
+    def replay(self):
+        try:
+            with open(self.journal_path, "r") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError):
+            return
+        for record in records:
+            op = record.get("op")
+            if op == "edit":
+                self.apply_edit(record["mass"], record["old"], record["new"])
+            elif op == "undo":
+                self.apply_undo()
+            elif op == "redo":
+                self.apply_redo()
+            elif op == "flush":
+                self.pending.clear()
+        data_cache.set_pending(self.path, self.pending)
+
+    def append(self, record):
+        with open(self.journal_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def apply_edit(self, mass, old, new):
+        self.undo_stack.append((mass, old, new))
+        self.redo_stack.clear()
+        self.pending[mass] = new
+
+    def apply_undo(self):
+        if not self.undo_stack:
+            return None
+        mass, old, new = self.undo_stack.pop()
+        self.redo_stack.append((mass, old, new))
+        self.pending[mass] = old
+        return mass
+
+    def apply_redo(self):
+        if not self.redo_stack:
+            return None
+        mass, old, new = self.redo_stack.pop()
+        self.undo_stack.append((mass, old, new))
+        self.pending[mass] = new
+        return mass
+
+# === 2. Editing ===
+    def record(self, x_mass, new_value):
+        mass, cross_section = data_cache.load_xy(self.path)
+        idx = int(np.nanargmin(np.abs(mass - x_mass)))
+        record = {"op": "edit", "mass": float(mass[idx]), "old": float(cross_section[idx]), "new": float(new_value)}
+        self.append(record)
+        self.apply_edit(record["mass"], record["old"], record["new"])
+        data_cache.set_pending(self.path, self.pending)
+
+    def undo(self):
+        if self.apply_undo() is None:
+            return False
+        self.append({"op": "undo"})
+        data_cache.set_pending(self.path, self.pending)
+        return True
+
+    def redo(self):
+        if self.apply_redo() is None:
+            return False
+        self.append({"op": "redo"})
+        data_cache.set_pending(self.path, self.pending)
+        return True
+
+# === 3. Writing back ===
+    def flush(self):
+        if not self.pending:
+            return False
+
+        # A sum may be rewritten by the compute worker at the same time
+        with data_cache.write_lock(self.path):
+            mass, cross_section = data_cache.read_xy(self.path)
+            cross_section = cross_section.copy()
+            for m, value in self.pending.items():
+                cross_section[mass == m] = value
+
+            backup_path = self.path + ".bak"
+            if not os.path.exists(backup_path):
+                shutil.copy2(self.path, backup_path)
+            data_cache.write_xy(self.path, mass, cross_section)
+
+        self.pending.clear()
+        data_cache.set_pending(self.path, None)
+        self.append({"op": "flush"})
+        if len(self.undo_stack) + len(self.redo_stack) > MAX_HISTORY:
+            self.compact()
+        return True
+
+    def compact(self):
+        # Rewrite the sidecar with only the most recent edits that can still be undone
+        self.undo_stack = self.undo_stack[-MAX_HISTORY:]
+        self.redo_stack.clear()
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for mass, old, new in self.undo_stack:
+                f.write(json.dumps({"op": "edit", "mass": mass, "old": old, "new": new}) + "\n")
+            f.write(json.dumps({"op": "flush"}) + "\n")
+        os.replace(tmp_path, self.journal_path)
+
+# === 4. Journals of all files edited in a GUI session ===
+class JournalManager:
+    def __init__(self, root, idle_ms=1500):
+        self.root = root
+        self.idle_ms = idle_ms
+        self.journals = {}
+        self.undo_order = []
+        self.redo_order = []
+        self.flush_job = None
+
+    def journal_for(self, path):
+        path = os.path.abspath(path)
+        journal = self.journals.get(path)
+        if journal is None:
+            journal = self.journals[path] = EditJournal(path)
+            # History from earlier sessions can be undone after this session's edits
+            self.undo_order[:0] = [path] * len(journal.undo_stack)
+            self.redo_order[:0] = [path] * len(journal.redo_stack)
+        return journal
+
+    def open(self, paths):
+        # Pick up the sidecars of files shown in the GUI: their unflushed edits (e.g. after a
+        # crash) are applied on load and written out, and their undo history is available
+        # before the file is edited again
+        unflushed = False
+        for path in paths:
+            if os.path.abspath(path) not in self.journals and os.path.exists(path + JOURNAL_SUFFIX):
+                unflushed |= bool(self.journal_for(path).pending)
+        if unflushed:
+            self.schedule_flush()
+
+    def record(self, path, x_mass, new_value):
+        journal = self.journal_for(path)
+        journal.record(x_mass, new_value)
+        self.undo_order.append(journal.path)
+        self.redo_order.clear()
+        self.schedule_flush()
+
+    def undo(self):
+        while self.undo_order:
+            path = self.undo_order.pop()
+            if self.journals[path].undo():
+                self.redo_order.append(path)
+                self.schedule_flush()
+                return True
+        return False
+
+    def redo(self):
+        while self.redo_order:
+            path = self.redo_order.pop()
+            if self.journals[path].redo():
+                self.undo_order.append(path)
+                self.schedule_flush()
+                return True
+        return False
+
+    def schedule_flush(self):
+        if self.flush_job is not None:
+            self.root.after_cancel(self.flush_job)
+        self.flush_job = self.root.after(self.idle_ms, self.flush_all)
+
+    def flush_all(self):
+        self.flush_job = None
+        for journal in self.journals.values():
+            journal.flush()
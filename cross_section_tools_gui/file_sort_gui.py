@@ -1,7 +1,10 @@
 import os
-import shutil
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
+from transfer import TransferEngine
+from ingest_manifest import IngestManifest, describe, hash_files
+from compute_worker import ComputeWorker
+import ingest_rules
 
 class FileMoverApp:
 
@@ -20,48 +23,24 @@ class FileMoverApp:
         self.file_entries = {}
 
         self.start_folder = os.getcwd()
-
-        self.final_processes = [
-            "weak t-channel process",
-            "associated production",
-            "pair production"
-        ]
-        self.energies = ["14", "100"]
-
-        self.default_mapping = {
-            "comphep_1": ("weak t-channel process", "14"),
-            "comphep_2": ("weak t-channel process", "100"),
-            "comphep_3": ("associated production", "14"),
-            "comphep_4": ("associated production", "100"),
-            "comphep_5": ("pair production", "14"),
-            "comphep_6": ("pair production", "100"),
-            "comphep": ("weak t-channel process", "14"),
-        }
-
-        self.rename_map = {
-            "cb": "phib", "Cb": "phib_conj",
-            "ca": "phia", "Ca": "phia_conj",
-            "ch": "phi",
-            "ha": "psia", "Ha": "psia_conj",
-            "hb": "psib", "Hb": "psib_conj"
-        }
-
-        self.default_suffixes = {
-            "2X": [["cb", "Cb"], ["ca", "Ca"], ["ch", "ch"], ["hb", "Hb"], ["ha", "Ha"]],
-            "3X": [["Cb", "Cb", "Cb"], ["Ca", "Cb", "Cb"], ["ch", "cb", "Cb"], ["Ca", "Ca", "Cb"],
-                   ["Ha", "hb", "Cb"], ["cb", "cb", "cb"], ["ca", "cb", "cb"], ["ca", "ca", "cb"],
-                   ["ha", "Hb", "cb"], ["Ca", "Ca", "Ca"], ["ch", "ca", "Ca"], ["Ha", "hb", "Ca"],
-                   ["ca", "ca", "ca"], ["ha", "Hb", "ca"], ["ch", "ch", "ch"], ["hb", "Hb", "ch"],
-                   ["ha", "Ha", "ch"]],
-            "4X": [["ch", "Cb", "Cb", "Cb"], ["cb", "cb", "Cb", "Cb"], ["ch", "Ca", "Cb", "Cb"],
-                   ["ca", "ca", "Cb", "Cb"], ["ca", "Ca", "cb", "Cb"], ["ch", "ch", "cb", "Cb"],
-                   ["ch", "Ca", "Ca", "Cb"], ["ch", "cb", "cb", "cb"], ["Ca", "Ca", "cb", "cb"],
-                   ["ch", "ca", "cb", "cb"], ["ch", "ca", "ca", "cb"], ["ch", "Ca", "Ca", "Ca"],
-                   ["ca", "ca", "Ca", "Ca"], ["ch", "ch", "ca", "Ca"], ["ch", "ca", "ca", "ca"],
-                   ["ch", "ch", "ch", "ch"]]
-        }
+        self.transfers = TransferEngine(root)
+        self.worker = ComputeWorker(root)
+        self.checking = set()
+        self.manifest = None
+        self.last_scan = None
+        self.file_labels = {}
+        self.label_job = None
+
+        self.final_processes = ingest_rules.FINAL_PROCESSES
+        self.energies = ingest_rules.ENERGIES
+        self.default_mapping = ingest_rules.DEFAULT_MAPPING
+        self.rename_map = ingest_rules.RENAME_MAP
+        self.default_suffixes = ingest_rules.DEFAULT_SUFFIXES
 
         self.build_gui()
+        # The row labels compare every file with its destination, so they follow these fields
+        for var in (self.choice_var, self.m_r_var, self.sin_theta_var, self.lambda_var):
+            var.trace_add("write", lambda *args: self.schedule_label_refresh())
         root.after(100, self.find_files)
 
 # === 2. Build GUI layout ===
@@ -81,7 +60,7 @@ class FileMoverApp:
         tk.Label(top_frame, text="Mode:").grid(row=0, column=0, sticky="w")
         radio_frame = tk.Frame(top_frame)
         radio_frame.grid(row=0, column=1, columnspan=5, sticky="w", padx=10)
-        for i, opt in enumerate(["2X", "3X", "4X"]):
+        for i, opt in enumerate(ingest_rules.FINAL_STATES):
             tk.Radiobutton(radio_frame, text=opt, variable=self.choice_var, value=opt).grid(row=0, column=i, padx=10)
 
         tk.Label(top_frame, text="M_r:").grid(row=1, column=0, sticky="e")
@@ -91,8 +70,10 @@ class FileMoverApp:
         tk.Label(top_frame, text="sin θ:").grid(row=1, column=4, sticky="e")
         tk.Entry(top_frame, textvariable=self.sin_theta_var).grid(row=1, column=5, sticky="w")
 
-        tk.Button(top_frame, text="Choose Start Folder", command=self.choose_folder).grid(row=2, column=0, columnspan=2, pady=5, sticky="w")
-        tk.Button(top_frame, text="Find Files", command=self.find_files).grid(row=2, column=2, columnspan=2, pady=5, sticky="w")
+        self.choose_button = tk.Button(top_frame, text="Choose Start Folder", command=self.choose_folder)
+        self.choose_button.grid(row=2, column=0, columnspan=2, pady=5, sticky="w")
+        self.find_button = tk.Button(top_frame, text="Find Files", command=self.find_files)
+        self.find_button.grid(row=2, column=2, columnspan=2, pady=5, sticky="w")
 
         self.mapping_frame = tk.Frame(left_frame)
         self.mapping_frame.pack(pady=10, fill="x")
@@ -124,7 +105,108 @@ class FileMoverApp:
         self.log_text.config(state="disabled")
         self.log_text.see(tk.END)
 
+    def validate_start_folder(self):
+        if not os.path.isdir(self.start_folder):
+            messagebox.showerror("Error", f"Folder not found:\n{self.start_folder}")
+            return False
+        return True
+
+    def output_dir(self):
+        return os.path.join(os.getcwd(), "organized_output")
+
+    def target_folder(self, folder):
+        # Destination folder of the files of a comphep_* folder, None while a field is empty
+        vars = self.folder_target_vars.get(folder)
+        params = [var.get().strip() for var in (self.m_r_var, self.sin_theta_var, self.lambda_var)]
+        if not vars or not all(params):
+            return None
+        process = vars["process"].get()
+        energy = vars["energy"].get()
+        if not process or not energy:
+            return None
+        return ingest_rules.target_dir(self.output_dir(), process, energy, self.choice_var.get(),
+                                       ingest_rules.parameter_folder(*params))
+
+    def destinations(self, folder):
+        # Target file of every file of the folder under the names chosen in its tab (or None)
+        target_path = self.target_folder(folder)
+        dsts = []
+        for combo in self.file_entries.get(folder, []):
+            name = ingest_rules.clean_name(combo.get().strip())
+            dsts.append(os.path.join(target_path, f"{ingest_rules.safe_filename(name)}.txt")
+                        if target_path and name else None)
+        return dsts
+
+    def file_label_text(self, file_path, dst=None, status=None):
+        # Files that need hashing are shown as "modified?" and queued for check_touched()
+        name = os.path.basename(file_path)
+        status = status or self.manifest.status(file_path, dst, check_content=False)
+        overwrite = dst is not None and os.path.exists(dst)
+        if status == "unchanged":
+            return f"{name} (already at destination)" if dst else f"{name} (ingested)"
+        if status == "modified":
+            return f"{name} (modified, would overwrite)" if overwrite else f"{name} (modified)"
+        if status == "touched":
+            self.checking.add(file_path)
+            return f"{name} (modified?)"
+        return f"{name} (would overwrite)" if overwrite else name
+
+    def schedule_label_refresh(self):
+        if self.label_job is not None:
+            self.root.after_cancel(self.label_job)
+        self.label_job = self.root.after(300, self.refresh_labels)
+
+    def refresh_labels(self):
+        self.label_job = None
+        if self.manifest is None:
+            return
+        self.checking.clear()
+        for folder, files in self.files_to_rename.items():
+            for label, file_path, dst in zip(self.file_labels.get(folder, []), files, self.destinations(folder)):
+                label.config(text=self.file_label_text(file_path, dst))
+        self.manifest.save()
+        self.check_touched()
+
+    def check_touched(self):
+        # Hash the touched files on the compute worker; a rescan supersedes a running check
+        if not self.checking:
+            return
+        paths = sorted(self.checking)
+        self.worker.submit("status", lambda: hash_files(paths), self.on_touched_checked, self.on_check_failed)
+
+    def on_touched_checked(self, hashes):
+        labels = {file_path: (label, dst) for folder, files in self.files_to_rename.items()
+                  for label, file_path, dst in zip(self.file_labels.get(folder, []), files, self.destinations(folder))}
+        for file_path, (mtime_ns, sha1) in hashes.items():
+            if file_path in labels:
+                label, dst = labels[file_path]
+                label.config(text=self.file_label_text(file_path, dst, self.manifest.resolve(file_path, mtime_ns, sha1)))
+        self.checking.clear()
+        self.manifest.save()
+
+    def on_check_failed(self, error):
+        self.checking.clear()
+        self.append_log(f"Could not check changed files: {error}")
+
+    def set_transfer_running(self, running):
+        # No rescans or second transfer while files are being moved
+        state = "disabled" if running else "normal"
+        for button in (self.choose_button, self.find_button, self.move_button, self.copy_button):
+            button.config(state=state)
+
     def find_files(self):
+        if self.transfers.running or not self.validate_start_folder():
+            return
+        found = ingest_rules.find_run_folders(self.start_folder)
+        self.manifest = IngestManifest(self.output_dir())
+        self.checking.clear()
+
+        scan = (self.start_folder, self.choice_var.get(), found)
+        if scan == self.last_scan:
+            # Same folders, files and mode: keep the tabs and the chosen names, only refresh the status
+            self.refresh_labels()
+            return
+
         for widget in self.mapping_frame.winfo_children():
             widget.destroy()
         for tab in self.notebook.tabs():
@@ -132,64 +214,58 @@ class FileMoverApp:
         self.files_to_rename.clear()
         self.folder_target_vars.clear()
         self.file_entries.clear()
+        self.file_labels.clear()
 
-        if not self.validate_start_folder():
-            return
-
-        row = 0
-        for folder in sorted(os.listdir(self.start_folder)):
-            folder_path = os.path.join(self.start_folder, folder)
-            is_comphep_star = folder.startswith("comphep_")
+        for row, (folder, files) in enumerate(found.items()):
             is_comphep = folder.lower() == "comphep"
-
-            if os.path.isdir(folder_path) and (is_comphep_star or is_comphep):
-                results_path = os.path.join(folder_path, "results")
-                files = []
-                if os.path.exists(results_path):
-                    hist_files = [f for f in os.listdir(results_path)
-                                  if f.startswith("hist1d_") and f.endswith(".txt")]
-                    hist_files.sort(key=lambda x: int(x.split("_")[1].split(".")[0]))
-                    files = [os.path.join(results_path, f) for f in hist_files]
-
-                self.files_to_rename[folder] = files
-
-                selected_var = tk.BooleanVar(value=not is_comphep)
-                process_var = tk.StringVar()
-                energy_var = tk.StringVar()
-                process_var.set(self.default_mapping.get(folder, ("", ""))[0])
-                energy_var.set(self.default_mapping.get(folder, ("", ""))[1])
-
-                tk.Checkbutton(self.mapping_frame, text=folder, variable=selected_var,
-                               command=lambda f=folder: self.toggle_tab(f)).grid(row=row, column=0, sticky="w")
-                ttk.Combobox(self.mapping_frame, textvariable=process_var, values=self.final_processes, width=30).grid(row=row, column=1)
-                ttk.Combobox(self.mapping_frame, textvariable=energy_var, values=self.energies, width=5).grid(row=row, column=2)
-
-                self.folder_target_vars[folder] = {
-                    "selected": selected_var,
-                    "process": process_var,
-                    "energy": energy_var
-                }
-
-                tab = tk.Frame(self.notebook)
-                self.notebook.add(tab, text=folder)
-                self.notebook.tab(tab, state="normal" if selected_var.get() else "disabled")
-
-                file_entries = []
-                options = self.get_default_options()
-                if files:
-                    for idx, file_path in enumerate(files):
-                        tk.Label(tab, text=os.path.basename(file_path)).grid(row=idx, column=0, sticky="w")
-                        combo = ttk.Combobox(tab, values=options, width=40)
-                        combo.grid(row=idx, column=1)
-                        if idx < len(options):
-                            combo.set(options[idx])
-                        file_entries.append(combo)
-                else:
-                    tk.Label(tab, text="No files to display").grid(row=0, column=0, sticky="w")
-
-                self.file_entries[folder] = file_entries
-                row += 1
-
+            self.files_to_rename[folder] = files
+
+            selected_var = tk.BooleanVar(value=not is_comphep)
+            process_var = tk.StringVar()
+            energy_var = tk.StringVar()
+            process_var.set(self.default_mapping.get(folder, ("", ""))[0])
+            energy_var.set(self.default_mapping.get(folder, ("", ""))[1])
+            process_var.trace_add("write", lambda *args: self.schedule_label_refresh())
+            energy_var.trace_add("write", lambda *args: self.schedule_label_refresh())
+
+            tk.Checkbutton(self.mapping_frame, text=folder, variable=selected_var,
+                           command=lambda f=folder: self.toggle_tab(f)).grid(row=row, column=0, sticky="w")
+            ttk.Combobox(self.mapping_frame, textvariable=process_var, values=self.final_processes, width=30).grid(row=row, column=1)
+            ttk.Combobox(self.mapping_frame, textvariable=energy_var, values=self.energies, width=5).grid(row=row, column=2)
+
+            self.folder_target_vars[folder] = {
+                "selected": selected_var,
+                "process": process_var,
+                "energy": energy_var
+            }
+
+            tab = tk.Frame(self.notebook)
+            self.notebook.add(tab, text=folder)
+            self.notebook.tab(tab, state="normal" if selected_var.get() else "disabled")
+
+            file_entries = []
+            file_labels = []
+            options = self.get_default_options()
+            if files:
+                for idx, file_path in enumerate(files):
+                    label = tk.Label(tab, text=os.path.basename(file_path))
+                    label.grid(row=idx, column=0, sticky="w")
+                    name_var = tk.StringVar()
+                    combo = ttk.Combobox(tab, textvariable=name_var, values=options, width=40)
+                    combo.grid(row=idx, column=1)
+                    if idx < len(options):
+                        combo.set(options[idx])
+                    name_var.trace_add("write", lambda *args: self.schedule_label_refresh())
+                    file_entries.append(combo)
+                    file_labels.append(label)
+            else:
+                tk.Label(tab, text="No files to display").grid(row=0, column=0, sticky="w")
+
+            self.file_entries[folder] = file_entries
+            self.file_labels[folder] = file_labels
+
+        self.last_scan = scan
+        self.refresh_labels()
         if self.files_to_rename:
             self.move_button.config(state="normal")
             self.copy_button.config(state="normal")
@@ -206,13 +282,7 @@ class FileMoverApp:
                 break
 
     def get_default_options(self):
-        mode = self.choice_var.get()
-        template = self.default_suffixes.get(mode, [])
-        options = []
-        for idx, parts in enumerate(template, start=1):
-            renamed = [self.rename_map.get(p, p) for p in parts]
-            options.append(f"{idx}. {'_'.join(renamed)}")
-        return options
+        return ingest_rules.default_options(self.choice_var.get())
 
     def copy_from_first_tab(self):
         tabs = self.notebook.tabs()
@@ -231,66 +301,88 @@ class FileMoverApp:
         m_r = self.m_r_var.get().strip()
         sin_theta = self.sin_theta_var.get().strip()
         lambd = self.lambda_var.get().strip()
-        mode = self.choice_var.get()
 
         if not all([m_r, sin_theta, lambd]):
             messagebox.showerror("Error", "All fields (M_r, sin θ, Lambda) must be filled!")
             return
 
-        new_folder = f"{m_r}_{sin_theta}_{lambd}"
-        base_target = os.path.join(os.getcwd(), "organized_output")
+        if self.checking:
+            messagebox.showinfo("Please wait", f"Still checking {len(self.checking)} changed files against earlier ingests.")
+            return
 
+        base_target = self.output_dir()
+        if self.manifest is None:
+            self.manifest = IngestManifest(base_target)
+
+        # Check every folder before anything is transferred
+        jobs = []
+        skipped = 0
         for folder_name, files in self.files_to_rename.items():
             vars = self.folder_target_vars.get(folder_name)
             if not vars or not vars["selected"].get():
                 continue
 
-            process = vars["process"].get()
-            energy = vars["energy"].get()
-            if not process or not energy:
+            target_path = self.target_folder(folder_name)
+            if target_path is None:
                 continue
 
             entries = self.file_entries.get(folder_name, [])
-            target_path = os.path.join(base_target, process, energy, mode, new_folder)
-            os.makedirs(target_path, exist_ok=True)
 
-            copied_files = []
-            name_set = set()
-            for combo in entries:
-                name = combo.get().strip()
-                if not name:
-                    continue
-                name_clean = name.split(". ", 1)[1] if ". " in name else name
-                if name_clean in name_set:
-                    messagebox.showerror("Error", f"Duplicate names in folder {folder_name}: {name_clean}")
-                    return
-                name_set.add(name_clean)
-
-            for src_file, combo in zip(files, entries):
-                name = combo.get().strip()
+            names = [ingest_rules.clean_name(combo.get().strip()) for combo in entries]
+            duplicates = ingest_rules.find_duplicates(name for name in names if name)
+            if duplicates:
+                messagebox.showerror("Error", f"Duplicate names in folder {folder_name}: {duplicates[0]}")
+                return
+
+            for src_file, name in zip(files, names):
                 if not name:
                     continue
-                name = name.split(". ", 1)[1] if ". " in name else name
-                safe_name = "".join(c for c in name if c not in '<>:"/\\|?*')
+                safe_name = ingest_rules.safe_filename(name)
                 dst_file = os.path.join(target_path, f"{safe_name}.txt")
+                # Files touched since the last check are transferred rather than hashed here
+                if self.manifest.status(src_file, dst_file, check_content=False) == "unchanged":
+                    skipped += 1  # already ingested to the same place
+                    continue
+                jobs.append((folder_name, src_file, dst_file))
 
-                try:
-                    shutil.copy2(src_file, dst_file)
-                    copied_files.append(src_file)
-                    self.append_log(f"{folder_name}: {os.path.basename(src_file)} → {dst_file}")
-                except Exception as e:
-                    self.append_log(f"Error copying {src_file}: {e}")
-
-            if copied_files:
-                answer = messagebox.askyesno("Delete Files?", f"Files from {folder_name} successfully transferred.\nDelete original files?")
-                if answer:
-                    for f in copied_files:
-                        try:
-                            os.remove(f)
-                            self.append_log(f"Deleted file {os.path.basename(f)} from {folder_name}")
-                        except Exception as e:
-                            self.append_log(f"Failed to delete {os.path.basename(f)}: {e}")
+        if skipped:
+            self.append_log(f"Skipped {skipped} files already ingested and unchanged")
+        if not jobs:
+            messagebox.showinfo("Completed", "No new or modified files to transfer.")
+            return
+
+        # Moving lets files on the same drive be renamed instead of copied
+        delete = messagebox.askyesno("Delete Files?", f"{len(jobs)} files will be transferred.\nDelete original files after the transfer?")
+        for target_path in {os.path.dirname(dst) for _, _, dst in jobs}:
+            os.makedirs(target_path, exist_ok=True)
+
+        self.set_transfer_running(True)
+        self.append_log(f"Transferring {len(jobs)} files ({'move' if delete else 'copy'})...")
+        self.transfers.start(jobs, "move" if delete else "copy", self.on_transfer_progress, self.on_transfer_done,
+                             prepare=describe)
+
+    def on_transfer_progress(self, events):
+        lines = []
+        for folder_name, src_file, dst_file, how, error, info in events:
+            if error is None:
+                lines.append(f"{folder_name}: {os.path.basename(src_file)} → {dst_file}")
+            else:
+                lines.append(f"Error transferring {src_file}: {error}")
+        self.append_log("\n".join(lines))
+
+    def on_transfer_done(self, events):
+        self.set_transfer_running(False)
+        failed = renamed = 0
+        for folder_name, src_file, dst_file, how, error, info in events:
+            if error is not None:
+                failed += 1
+                continue
+            renamed += how in ("renamed", "linked")
+            self.manifest.record(src_file, dst_file, info)
+        self.manifest.save()
+        self.append_log(f"Done: {len(events) - failed} transferred ({renamed} without copying), {failed} failed")
         messagebox.showinfo("Completed", "File transfer completed.")
+        self.find_files()
 
 # === 6. Launch application ===   
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import ingest_rules
+from ingest_manifest import IngestManifest, describe
+from transfer import MODES, transfer_file
+
+# Headless version of file_sort_gui.py: routes comphep_*/results/hist1d_K.txt into
+# <process>/<energy>/<final state>/<M_r>_<sin>_<Lambda>/<channel>.txt from a JSON config.
+#
+#   python ingest.py ingest.json [--start runs/] [--workers 16] [--dry-run]
+#
+# {
+#   "output": "organized_output",
+#   "mode": "copy",
+#   "defaults": {"final_state": "2X", "m_r": "150", "sin_theta": "0.01", "lambda": "3000"},
+#   "runs": [
+#     {"folder": "comphep_1"},
+#     {"folder": "night_*/comphep_5", "final_state": "3X"},
+#     {"folder": "comphep_7", "process": "pair production", "energy": "14",
+#      "channels": {"hist1d_1.txt": "phib_phib_conj", "hist1d_2.txt": "phia_phia_conj"}}
+#   ]
+# }
+#
+# "mode" is copy, move or link (see transfer.py). Each run takes the "defaults" and may
+# override them; process and energy default to the GUI's mapping of comphep_1..6, and
+# "folder" may be a glob pattern. "channels" is optional: a list (K-th histogram -> K-th
+# name) or a {file: name} map; by default the GUI order of the final state is used.
+# Duplicate channel names in a run, or two sources (e.g. several runs matched by one glob
+# with the same parameters) going to the same target file, abort the whole ingest before
+# any file is touched (exit code 2). Files already ingested unchanged to the same place (see
+# ingest_manifest.py) are skipped unless --force.
+
+RUN_KEYS = ["process", "energy", "final_state", "m_r", "sin_theta", "lambda"]
+
+class ConfigError(Exception):
+    pass
+
+# === 1. Config -> transfer jobs ===
+def load_config(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def expand_runs(config, start_folder):
+    defaults = config.get("defaults", {})
+    runs = []
+    for spec in config.get("runs", []):
+        if "folder" not in spec:
+            raise ConfigError(f"Run without a 'folder': {spec}")
+        pattern = os.path.join(start_folder, spec["folder"])
+        paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths = [path for path in paths if os.path.isdir(path)]
+        if not paths:
+            raise ConfigError(f"No run folder matches '{spec['folder']}'")
+        for path in paths:
+            run = dict(defaults, **spec)
+            name = os.path.basename(os.path.normpath(path))
+            process, energy = ingest_rules.DEFAULT_MAPPING.get(name, ("", ""))
+            run.setdefault("process", process)
+            run.setdefault("energy", energy)
+            run["path"] = path
+            run["name"] = os.path.relpath(path, start_folder)
+            missing = [key for key in RUN_KEYS if not str(run.get(key, "")).strip()]
+            if missing:
+                raise ConfigError(f"{run['name']}: missing {', '.join(missing)}")
+            runs.append(run)
+    return runs
+
+def channel_map(run, files):
+    # [(src, channel name)] for one run
+    channels = run.get("channels")
+    if channels is None:
+        channels = ingest_rules.channel_names(run["final_state"])
+    if isinstance(channels, dict):
+        by_name = {os.path.basename(f): f for f in files}
+        unknown = [name for name in channels if name not in by_name]
+        if unknown:
+            raise ConfigError(f"{run['name']}: no such histogram(s): {', '.join(unknown)}")
+        return [(by_name[name], ingest_rules.clean_name(channel)) for name, channel in channels.items()]
+    return [(src, ingest_rules.clean_name(channel)) for src, channel in zip(files, channels)]
+
+def plan(runs, output_dir):
+    # All jobs of all runs, or ConfigError listing every run with duplicate channel names
+    # and every target file that more than one source would be written to
+    jobs, problems = [], []
+    sources = {}
+    for run in runs:
+        files = ingest_rules.find_hist_files(run["path"])
+        pairs = [(src, name) for src, name in channel_map(run, files) if name]
+        duplicates = ingest_rules.find_duplicates(name for _, name in pairs)
+        if duplicates:
+            problems.append(f"{run['name']}: duplicate channel names: {', '.join(duplicates)}")
+            continue
+        if len(files) > len(pairs):
+            print(f"{run['name']}: {len(files) - len(pairs)} histograms without a channel name are left out")
+        params = ingest_rules.parameter_folder(run["m_r"], run["sin_theta"], run["lambda"])
+        target_path = ingest_rules.target_dir(output_dir, run["process"], str(run["energy"]), run["final_state"], params)
+        for src, name in pairs:
+            dst = os.path.join(target_path, f"{ingest_rules.safe_filename(name)}.txt")
+            sources.setdefault(dst, []).append(f"{run['name']}/{os.path.basename(src)}")
+            jobs.append((run["name"], src, dst))
+    for dst, srcs in sources.items():
+        if len(srcs) > 1:
+            problems.append(f"{os.path.relpath(dst, output_dir)} would be written by {', '.join(srcs)}")
+    if problems:
+        raise ConfigError("\n".join(problems))
+    return jobs
+
+# === 2. Transfer ===
+def ingest_file(src, dst, mode):
+    info = describe(src)
+    return transfer_file(src, dst, mode), info
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Route CompHEP histogram files into the data tree from a JSON config.")
+    parser.add_argument("config", help="JSON file with the runs to ingest")
+    parser.add_argument("--start", help="folder containing the run folders (default: the config's folder)")
+    parser.add_argument("--output", help="data tree root (overrides the config's 'output')")
+    parser.add_argument("--mode", choices=MODES, help="overrides the config's 'mode' (default: copy)")
+    parser.add_argument("--workers", type=int, default=8, help="number of transfer threads")
+    parser.add_argument("--force", action="store_true", help="transfer files even if already ingested unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="only print what would be transferred")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot read {args.config}: {e}")
+    start_folder = args.start or os.path.dirname(os.path.abspath(args.config))
+    output_dir = os.path.abspath(args.output or os.path.join(start_folder, config.get("output", "organized_output")))
+    mode = args.mode or config.get("mode", "copy")
+    if mode not in MODES:
+        parser.error(f"unknown mode '{mode}'")
+
+    try:
+        jobs = plan(expand_runs(config, start_folder), output_dir)
+    except ConfigError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    manifest = IngestManifest(output_dir)
+    pending = [job for job in jobs if args.force or manifest.status(job[1], job[2]) != "unchanged"]
+    print(f"{len(jobs)} files, {len(jobs) - len(pending)} already ingested, {len(pending)} to {mode}")
+    if args.dry_run:
+        for run_name, src, dst in pending:
+            print(f"{run_name}: {os.path.basename(src)} -> {dst}")
+        return 0
+
+    for target_path in {os.path.dirname(dst) for _, _, dst in pending}:
+        os.makedirs(target_path, exist_ok=True)
+
+    started = time.perf_counter()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(ingest_file, src, dst, mode): (run_name, src, dst) for run_name, src, dst in pending}
+        for future in as_completed(futures):
+            run_name, src, dst = futures[future]
+            try:
+                how, info = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{run_name}: error transferring {os.path.basename(src)}: {e}")
+                continue
+            manifest.record(src, dst, info)
+    manifest.save()
+    print(f"Ingested {len(pending) - failed} files in {time.perf_counter() - started:.2f} s, {failed} failed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import os
+import json
+import hashlib
+
+# Record of the histogram files already ingested from comphep_*/results, kept as
+# ".ingest_manifest.json" in the output folder. For each source file it stores the
+# size, mtime, SHA-1 of the content and where it went. A later scan or transfer skips
+# files that are unchanged and still present at their destination.
+# A changed size/mtime alone does not count as a change if the content hash still matches.
+# The GUI asks for the status without hashing ("touched" for a file whose mtime changed but
+# not its size), hashes those files off the Tk thread with hash_files() and then resolve()s them.
+
+MANIFEST_NAME = ".ingest_manifest.json"
+
+# === 1. File descriptions ===
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def describe(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": file_hash(path)}
+
+def hash_files(paths):
+    # {path: (mtime_ns, sha1)}; the mtime is taken before hashing, unreadable files are left out
+    hashes = {}
+    for path in paths:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            hashes[path] = (mtime_ns, file_hash(path))
+        except OSError:
+            continue
+    return hashes
+
+# === 2. Manifest ===
+class IngestManifest:
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == 1:
+            self.entries = data.get("files", {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"version": 1, "files": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(self.path + ".tmp", self.path)
+        self.dirty = False
+
+    def status(self, src, dst=None, check_content=True):
+        # "new", "modified" or "unchanged"; with dst, a file ingested elsewhere counts as new.
+        # Without check_content, a file that was touched but kept its size is "touched".
+        entry = self.entries.get(os.path.abspath(src))
+        if entry is None:
+            return "new"
+        if dst is not None and os.path.abspath(dst) != entry["dest"]:
+            return "new"
+        if not os.path.exists(entry["dest"]):
+            return "new"
+        try:
+            st = os.stat(src)
+        except OSError:
+            return "new"
+        if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]:
+            return "unchanged"
+        if st.st_size != entry["size"]:
+            return "modified"
+        if not check_content:
+            return "touched"
+        return self.resolve(src, st.st_mtime_ns, file_hash(src))
+
+    def resolve(self, src, mtime_ns, sha1):
+        # Status of a touched file once its content hash is known
+        entry = self.entries.get(os.path.abspath(src))
+        if entry is None:
+            return "new"
+        if sha1 != entry["sha1"]:
+            return "modified"
+        # Identical: remember the new mtime so it is not hashed again
+        entry["mtime_ns"] = mtime_ns
+        self.dirty = True
+        return "unchanged"
+
+    def record(self, src, dst, description):
+        self.entries[os.path.abspath(src)] = dict(description, dest=os.path.abspath(dst))
+        self.dirty = True
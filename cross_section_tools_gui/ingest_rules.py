@@ -0,0 +1,95 @@
+import os
+
+# Routing of CompHEP output, shared by file_sort_gui.py and ingest.py:
+#   comphep_N/results/hist1d_K.txt -> <process>/<energy>/<final state>/<M_r>_<sin>_<Lambda>/<channel>.txt
+# The K-th histogram (in numeric order) is by default the K-th channel of the final state.
+
+FINAL_PROCESSES = [
+    "weak t-channel process",
+    "associated production",
+    "pair production"
+]
+ENERGIES = ["14", "100"]
+FINAL_STATES = ["2X", "3X", "4X"]
+
+DEFAULT_MAPPING = {
+    "comphep_1": ("weak t-channel process", "14"),
+    "comphep_2": ("weak t-channel process", "100"),
+    "comphep_3": ("associated production", "14"),
+    "comphep_4": ("associated production", "100"),
+    "comphep_5": ("pair production", "14"),
+    "comphep_6": ("pair production", "100"),
+    "comphep": ("weak t-channel process", "14"),
+}
+
+RENAME_MAP = {
+    "cb": "phib", "Cb": "phib_conj",
+    "ca": "phia", "Ca": "phia_conj",
+    "ch": "phi",
+    "ha": "psia", "Ha": "psia_conj",
+    "hb": "psib", "Hb": "psib_conj"
+}
+
+DEFAULT_SUFFIXES = {
+    "2X": [["cb", "Cb"], ["ca", "Ca"], ["ch", "ch"], ["hb", "Hb"], ["ha", "Ha"]],
+    "3X": [["Cb", "Cb", "Cb"], ["Ca", "Cb", "Cb"], ["ch", "cb", "Cb"], ["Ca", "Ca", "Cb"],
+           ["Ha", "hb", "Cb"], ["cb", "cb", "cb"], ["ca", "cb", "cb"], ["ca", "ca", "cb"],
+           ["ha", "Hb", "cb"], ["Ca", "Ca", "Ca"], ["ch", "ca", "Ca"], ["Ha", "hb", "Ca"],
+           ["ca", "ca", "ca"], ["ha", "Hb", "ca"], ["ch", "ch", "ch"], ["hb", "Hb", "ch"],
+           ["ha", "Ha", "ch"]],
+    "4X": [["ch", "Cb", "Cb", "Cb"], ["cb", "cb", "Cb", "Cb"], ["ch", "Ca", "Cb", "Cb"],
+           ["ca", "ca", "Cb", "Cb"], ["ca", "Ca", "cb", "Cb"], ["ch", "ch", "cb", "Cb"],
+           ["ch", "Ca", "Ca", "Cb"], ["ch", "cb", "cb", "cb"], ["Ca", "Ca", "cb", "cb"],
+           ["ch", "ca", "cb", "cb"], ["ch", "ca", "ca", "cb"], ["ch", "Ca", "Ca", "Ca"],
+           ["ca", "ca", "Ca", "Ca"], ["ch", "ch", "ca", "Ca"], ["ch", "ca", "ca", "ca"],
+           ["ch", "ch", "ch", "ch"]]
+}
+
+# === 1. Channel names ===
+def channel_names(mode):
+    return ["_".join(RENAME_MAP.get(p, p) for p in parts) for parts in DEFAULT_SUFFIXES.get(mode, [])]
+
+def default_options(mode):
+    # Combobox entries of the GUI: "1. phib_phib_conj", ...
+    return [f"{idx}. {name}" for idx, name in enumerate(channel_names(mode), start=1)]
+
+def clean_name(option):
+    return option.split(". ", 1)[1] if ". " in option else option
+
+def safe_filename(name):
+    return "".join(c for c in name if c not in '<>:"/\\|?*')
+
+def find_duplicates(names):
+    seen, duplicates = set(), []
+    for name in names:
+        if name in seen and name not in duplicates:
+            duplicates.append(name)
+        seen.add(name)
+    return duplicates
+
+# === 2. Source and target folders ===
+def is_run_folder(name):
+    return name.startswith("comphep_") or name.lower() == "comphep"
+
+def find_hist_files(run_path):
+    results_path = os.path.join(run_path, "results")
+    if not os.path.isdir(results_path):
+        return []
+    hist_files = [e.name for e in os.scandir(results_path)
+                  if e.name.startswith("hist1d_") and e.name.endswith(".txt")]
+    hist_files.sort(key=lambda x: int(x.split("_")[1].split(".")[0]))
+    return [os.path.join(results_path, f) for f in hist_files]
+
+def find_run_folders(start_folder):
+    # {run folder name: [hist1d_K.txt paths in numeric order]}
+    found = {}
+    for entry in sorted(os.scandir(start_folder), key=lambda e: e.name):
+        if entry.is_dir() and is_run_folder(entry.name):
+            found[entry.name] = find_hist_files(entry.path)
+    return found
+
+def parameter_folder(m_r, sin_theta, lambd):
+    return f"{m_r}_{sin_theta}_{lambd}"
+
+def target_dir(base_target, process, energy, mode, params):
+    return os.path.join(base_target, process, energy, mode, params)
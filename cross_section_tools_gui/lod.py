@@ -0,0 +1,107 @@
+import numpy as np
+
+# Level-of-detail reduction of dense curves before they reach matplotlib.
+# The visible x-range is cut into one bucket per pixel of the axes width (in the scale's
+# coordinates, so log axes get even buckets too) and only the lowest and highest point of
+# each bucket is drawn, plus the first and last point. The envelope of the curve is kept,
+# so a curve of tens of thousands of points looks the same but draws like a few thousand.
+# Curves with fewer points than that are drawn as they are. The full arrays stay here, and
+# the drawn points are recomputed whenever the x-limits or the canvas size change.
+# original_index() maps a drawn point back to the data for point editing.
+
+# === 1. Decimation ===
+def decimate(x, y, x_lo, x_hi, n_buckets, scale=None):
+    # Indices (ascending) of the points to draw for x in [x_lo, x_hi]; x must be sorted.
+    # The nearest point outside each end is kept so the line runs on to the axes edge.
+    n = len(x)
+    i0 = max(int(np.searchsorted(x, x_lo, "left")) - 1, 0)
+    i1 = min(int(np.searchsorted(x, x_hi, "right")) + 1, n)
+    if i1 - i0 <= 2 * n_buckets:
+        return np.arange(i0, i1)
+
+    tx = x[i0:i1]
+    t_lo, t_hi = x_lo, x_hi
+    if scale is not None:
+        tx = scale(tx)
+        t_lo, t_hi = scale(np.array([x_lo, x_hi], dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bucket = np.floor((tx - t_lo) / (t_hi - t_lo) * n_buckets)
+    bucket = np.clip(np.nan_to_num(bucket), -1, n_buckets).astype(np.int64)
+
+    # Sorted by bucket, then y: the first and last entry of each bucket are its min and max
+    order = np.lexsort((y[i0:i1], bucket))
+    b = bucket[order]
+    first = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    last = np.r_[first[1:] - 1, len(b) - 1]
+    keep = np.unique(np.concatenate(([0, i1 - i0 - 1], order[first], order[last])))
+    return keep + i0
+
+# === 2. Lines of one Axes ===
+class LodLines:
+    def __init__(self, ax, points_per_px=1):
+        self.ax = ax
+        self.points_per_px = points_per_px
+        self.data = {}  # Line2D -> [x, y, drawn indices or None if all are drawn, x sorted]
+        ax.callbacks.connect("xlim_changed", lambda _: self.refresh())
+        ax.figure.canvas.mpl_connect("resize_event", lambda _: self.refresh())
+
+    def set_data(self, line, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.array(y, dtype=float)  # own copy: set_point() writes into it
+        decimable = bool(len(x)) and bool(np.all(np.diff(x) >= 0))
+        self.data[line] = [x, y, None, decimable]
+        if decimable:
+            # Decimate over the whole curve: it keeps the x ends and the y extremes,
+            # so relim() and autoscaling see the same limits as with the full data
+            self.update_line(line, x[0], x[-1])
+        else:
+            line.set_data(x, y)
+
+    def forget(self, line):
+        self.data.pop(line, None)
+
+    def clear(self):
+        self.data.clear()
+
+    def full_data(self, line):
+        x, y, _, _ = self.data[line]
+        return x, y
+
+    def original_index(self, line, index):
+        entry = self.data.get(line)
+        if entry is None or entry[2] is None:
+            return index
+        return int(entry[2][index])
+
+    def set_point(self, line, index, y_value):
+        # After a point of the drawn line was dragged: apply it to the full data too
+        entry = self.data.get(line)
+        if entry is not None:
+            entry[1][self.original_index(line, index)] = y_value
+
+    def n_buckets(self):
+        return max(int(self.ax.bbox.width * self.points_per_px), 1)
+
+    def update_line(self, line, x_lo, x_hi):
+        x, y, _, _ = self.data[line]
+        keep = decimate(x, y, x_lo, x_hi, self.n_buckets(), self.ax.xaxis.get_transform().transform)
+        if len(keep) == len(x):
+            self.data[line][2] = None
+            line.set_data(x, y)
+        else:
+            self.data[line][2] = keep
+            line.set_data(x[keep], y[keep])
+
+    def refresh(self):
+        x_lo, x_hi = sorted(self.ax.get_xlim())
+        for line, (_, _, _, decimable) in self.data.items():
+            if line.get_animated() or not decimable:
+                continue  # being dragged, or never decimated
+            self.update_line(line, x_lo, x_hi)
+
+    def relim(self, visible_only=True):
+        # ax.relim() on the curves' full extent rather than the currently drawn x-range
+        for line, (x, _, keep, _) in self.data.items():
+            if keep is not None:
+                self.update_line(line, x[0], x[-1])
+        self.ax.relim(visible_only=visible_only)
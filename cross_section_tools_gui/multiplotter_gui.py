@@ -3,13 +3,14 @@
 import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.ticker import FuncFormatter
-from statsmodels.nonparametric.smoothers_lowess import lowess
-from scipy.interpolate import PchipInterpolator, UnivariateSpline
+import data_cache
+import smoothing
+import lod
+from compute_worker import ComputeWorker
 
 # === 1. Class to store file and plot options ===
 class FileEntry:
@@ -24,6 +25,10 @@ class FileEntry:
         self.xmax = tk.StringVar()
         self.data_min = None
         self.data_max = None
+        # Retained plot state: the inputs of the last fit, its result and the artist
+        self.spec = None
+        self.curve = None
+        self.line = None
 
 class IndividualPlotApp:
 # === 2. Application GUI ===    
@@ -34,12 +39,15 @@ class IndividualPlotApp:
         self.log_x = tk.BooleanVar()
         self.log_y = tk.BooleanVar()
         self.files = []
+        self.worker = ComputeWorker(root)
 
         self.fig, self.ax = plt.subplots()
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
         self.canvas.get_tk_widget().pack(side="right", fill="both", expand=True)
 
         self.setup_controls()
+        self.setup_axes()
+        self.lod = lod.LodLines(self.ax)
 
     def setup_controls(self):
         control_frame = tk.Frame(self.root)
@@ -49,8 +57,8 @@ class IndividualPlotApp:
         tk.Button(control_frame, text="Clear", command=self.clear_files).pack(pady=5)
         tk.Button(control_frame, text="Plot", command=self.plot_files).pack(pady=5)
 
-        tk.Checkbutton(control_frame, text="Log X", variable=self.log_x, command=self.plot_files).pack(anchor="w")
-        tk.Checkbutton(control_frame, text="Log Y", variable=self.log_y, command=self.plot_files).pack(anchor="w")
+        tk.Checkbutton(control_frame, text="Log X", variable=self.log_x, command=self.update_scales).pack(anchor="w")
+        tk.Checkbutton(control_frame, text="Log Y", variable=self.log_y, command=self.update_scales).pack(anchor="w")
 
         tk.Label(control_frame, text="Filename:").pack(pady=(10, 0))
         self.filename_entry = tk.Entry(control_frame)
@@ -62,7 +70,7 @@ class IndividualPlotApp:
         tk.Label(control_frame, text="Plot Title (LaTeX):").pack(pady=(10, 0))
         self.title_entry = tk.Entry(control_frame)
         self.title_entry.pack(fill="x")
-        self.title_entry.bind("<KeyRelease>", lambda event: self.plot_files())
+        self.title_entry.bind("<KeyRelease>", lambda event: self.update_title())
 
         header = tk.Frame(control_frame)
         header.pack()
@@ -75,13 +83,12 @@ class IndividualPlotApp:
 # === 3. File management ===
     def add_files(self):
         paths = filedialog.askopenfilenames(filetypes=[("Text files", "*.txt")])
+        added = []
         for path in paths:
             if not any(f.filepath == path for f in self.files):
                 entry = FileEntry(path)
                 try:
-                    df = pd.read_csv(path, delim_whitespace=True, header=None)
-                    df.columns = ['Mass', 'CrossSection']
-                    x = df['Mass'].values
+                    x, _ = data_cache.load_xy(path)
                     entry.data_min = np.min(x)
                     entry.data_max = np.max(x)
                     entry.xmin.set(str(entry.data_min))
@@ -91,8 +98,10 @@ class IndividualPlotApp:
                     continue
 
                 self.files.append(entry)
+                added.append(entry)
                 self.add_file_widget(entry)
-        self.plot_files()
+        for entry in added:
+            self.update_entry(entry)
 
     def add_file_widget(self, entry):
         row = tk.Frame(self.file_frame)
@@ -104,22 +113,22 @@ class IndividualPlotApp:
 
         deg_entry = tk.Entry(row, textvariable=entry.poly_degree, width=4)
         deg_entry.pack(side="left")
-        deg_entry.bind("<KeyRelease>", lambda event: self.plot_files())
+        deg_entry.bind("<KeyRelease>", lambda event: self.update_entry(entry))
 
         entry._xmin_widget = tk.Entry(row, textvariable=entry.xmin, width=6)
         entry._xmax_widget = tk.Entry(row, textvariable=entry.xmax, width=6)
         entry._xmin_widget.pack(side="left")
         entry._xmax_widget.pack(side="left")
-        entry._xmin_widget.bind("<KeyRelease>", lambda e: self.plot_files())
-        entry._xmax_widget.bind("<KeyRelease>", lambda e: self.plot_files())
+        entry._xmin_widget.bind("<KeyRelease>", lambda e: self.update_entry(entry))
+        entry._xmax_widget.bind("<KeyRelease>", lambda e: self.update_entry(entry))
 
         legend = tk.Entry(row, textvariable=entry.custom_label, width=25)
         legend.pack(side="left", padx=5)
-        legend.bind("<KeyRelease>", lambda e: self.plot_files())
+        legend.bind("<KeyRelease>", lambda e: self.update_legend(entry))
 
-        self.update_method(entry)
+        self.update_method(entry, redraw=False)
 
-    def update_method(self, entry):
+    def update_method(self, entry, redraw=True):
         method = entry.method.get()
         state = "normal" if method != "None" else "disabled"
         entry._xmin_widget.config(state=state)
@@ -129,96 +138,154 @@ class IndividualPlotApp:
             entry.xmin.set(str(entry.data_min))
             entry.xmax.set(str(entry.data_max))
 
-        self.plot_files()
+        if redraw:
+            self.update_entry(entry)
 
     def clear_files(self):
+        for entry in self.files:
+            if entry.line is not None:
+                entry.line.remove()
         self.files.clear()
+        self.lod.clear()
         for w in self.file_frame.winfo_children():
             w.destroy()
-        self.plot_files()
+        self.ax.set_prop_cycle(None)
+        self.refresh_legend()
+        self.update_limits()
+        self.canvas.draw_idle()
 
 # === 4. Plotting ===
-    def plot_files(self):
-        self.ax.clear()
-        all_y = []
-
-        for entry in self.files:
-            try:
-                df = pd.read_csv(entry.filepath, delim_whitespace=True, header=None)
-                df.columns = ['Mass', 'CrossSection']
-                x, y = df['Mass'].values, df['CrossSection'].values
-
-                try:
-                    xmin, xmax = float(entry.xmin.get()), float(entry.xmax.get())
-                except ValueError:
-                    xmin, xmax = x.min(), x.max()
-
-                mask = (x >= xmin) & (x <= xmax)
-                x_use, y_use = x[mask], y[mask]
-                x_full = np.linspace(xmin, xmax, 1000)
-
-                method = entry.method.get()
-                label = entry.custom_label.get().strip() or None
-
-                if method == "LOWESS":
-                    x_s, y_s = lowess(y_use, x_use, frac=0.15, return_sorted=True).T
-                    y_interp = np.interp(x_full, x_s, y_s)
-                    y_plot = y_interp
-                    self.ax.plot(x_full, y_plot, label=label, linewidth=3)
-
-                elif method == "PCHIP":
-                    interp = PchipInterpolator(x_use, y_use, extrapolate=False)
-                    y_plot = interp(x_full)
-                    self.ax.plot(x_full, y_plot, label=label, linewidth=3)
-
-                elif method == "Spline":
-                    spline = UnivariateSpline(x_use, y_use, s=0.5)
-                    y_plot = spline(x_full)
-                    self.ax.plot(x_full, y_plot, label=label, linewidth=3)
-
-                elif method == "PolyFit":
-                    deg = int(entry.poly_degree.get()) if entry.poly_degree.get().isdigit() else 5
-                    coeffs = np.polyfit(x_use, y_use, deg=deg)
-                    poly = np.poly1d(coeffs)
-                    y_plot = poly(x_full)
-                    self.ax.plot(x_full, y_plot, label=label, linewidth=3)
+    # Every FileEntry keeps its fitted curve and Line2D. A control of one entry refits only
+    # that entry (on the compute worker), title and legend edits only change text artists,
+    # and the log toggles only change the scales.
+    def setup_axes(self):
+        self.ax.set_xlabel(r"$M_{\phi_b}$ [GeV]", fontsize=20)
+        self.ax.set_ylabel(r"$\sigma$ [pb]", fontsize=20)
+        self.ax.grid(True, which="both", linestyle=":", linewidth=0.7)
+        self.ax.tick_params(axis="both", labelsize=15)
+        self.apply_scales()
 
-                else:
-                    self.ax.plot(x_use, y_use, label=label, linewidth=3)
-                    y_plot = y_use
+    def apply_scales(self):
+        # Setting a scale resets the tick formatter and locators, so they follow it
+        self.ax.set_xscale('log' if self.log_x.get() else 'linear')
+        self.ax.set_yscale('log' if self.log_y.get() else 'linear')
 
-                all_y.extend(y_plot[np.isfinite(y_plot)])
+        formatter = FuncFormatter(lambda x, _: f"$10^{{{int(np.log10(x))}}}$" if x > 0 else "$0$")
+        self.ax.yaxis.set_major_formatter(formatter)
+        self.ax.minorticks_on()
 
-            except Exception as e:
-                messagebox.showerror("Plot Error", f"{entry.label}:\n{e}")
+    def entry_spec(self, entry):
+        return {
+            'label': entry.label,
+            'filepath': entry.filepath,
+            'stamp': data_cache.file_stamp(entry.filepath),
+            'xmin': entry.xmin.get(),
+            'xmax': entry.xmax.get(),
+            'method': entry.method.get(),
+            'degree': entry.poly_degree.get(),
+        }
+
+    def update_entry(self, entry, force=False):
+        try:
+            spec = self.entry_spec(entry)
+        except OSError as e:
+            messagebox.showerror("Plot Error", f"{entry.label}:\n{e}")
+            return
+        if spec == entry.spec and not force:
+            return  # e.g. a cursor key: nothing that affects the fit changed
+        entry.spec = spec
+        self.worker.submit(f"entry-{id(entry)}", lambda: self.compute_curve(spec),
+                           lambda curve: self.set_curve(entry, curve),
+                           lambda error: self.set_curve_error(entry, error))
 
-        title = self.title_entry.get().strip()
-        if title:
-            self.ax.set_title(title, fontsize=22)
+    def plot_files(self):
+        # Plot button: refit every entry (files changed on disk are reloaded)
+        for entry in self.files:
+            self.update_entry(entry, force=True)
+        self.update_title()
 
-        self.ax.set_xlabel(r"$M_{\phi_b}$ [GeV]", fontsize=20)
-        self.ax.set_ylabel(r"$\sigma$ [pb]", fontsize=20)
-        self.ax.set_xscale('log' if self.log_x.get() else 'linear')
-        self.ax.set_yscale('log' if self.log_y.get() else 'linear')
+    def compute_curve(self, spec):
+        x, y = data_cache.load_xy(spec['filepath'])
 
-        if all_y and not self.log_y.get():
-            ymin, ymax = min(all_y), max(all_y)
+        try:
+            xmin, xmax = float(spec['xmin']), float(spec['xmax'])
+        except ValueError:
+            xmin, xmax = x.min(), x.max()
+
+        mask = (x >= xmin) & (x <= xmax)
+        x_use, y_use = x[mask], y[mask]
+        x_full = np.linspace(xmin, xmax, 1000)
+
+        method = spec['method']
+
+        if method in smoothing.METHODS:
+            deg = int(spec['degree']) if spec['degree'].isdigit() else 5
+            return smoothing.smooth(method, x_use, y_use, x_eval=x_full, frac=0.15, degree=deg, extrapolate=False)
+        return x_use, y_use
+
+    def set_curve(self, entry, curve):
+        if entry not in self.files:
+            return  # cleared meanwhile
+        entry.curve = curve
+        x_plot, y_plot = curve
+        if entry.line is None:
+            entry.line, = self.ax.plot([], [], linewidth=3)
+            self.update_legend(entry, redraw=False)
+        entry.line.set_visible(True)
+        self.lod.set_data(entry.line, x_plot, y_plot)
+        self.update_limits()
+        self.canvas.draw_idle()
+
+    def set_curve_error(self, entry, error):
+        entry.spec = None
+        entry.curve = None
+        if entry.line is not None:
+            entry.line.set_visible(False)
+            self.update_limits()
+            self.canvas.draw_idle()
+        messagebox.showerror("Plot Error", f"{entry.label}:\n{error}")
+
+    def update_limits(self):
+        self.lod.relim(visible_only=True)
+        finite = [y[np.isfinite(y)] for _, y in (entry.curve for entry in self.files if entry.curve is not None)]
+        all_y = np.concatenate(finite) if finite else np.empty(0)
+
+        if all_y.size and not self.log_y.get():
+            ymin, ymax = all_y.min(), all_y.max()
             if ymin == ymax:
                 ymin *= 0.9
                 ymax *= 1.1
             self.ax.set_ylim(ymin, ymax)
+            self.ax.autoscale_view(scaley=False)
+        else:
+            self.ax.set_autoscaley_on(True)
+            self.ax.autoscale_view()
 
-        formatter = FuncFormatter(lambda x, _: f"$10^{{{int(np.log10(x))}}}$" if x > 0 else "$0$")
-        self.ax.yaxis.set_major_formatter(formatter)
-
-        self.ax.grid(True, which="both", linestyle=":", linewidth=0.7)
-        self.ax.minorticks_on()
-        self.ax.tick_params(axis="both", labelsize=15)
+    def update_scales(self):
+        self.apply_scales()
+        self.update_limits()
+        self.canvas.draw_idle()
 
+    def update_title(self):
+        title = self.title_entry.get().strip()
+        if title != self.ax.get_title():
+            self.ax.set_title(title, fontsize=22)
+            self.canvas.draw_idle()
+
+    def update_legend(self, entry, redraw=True):
+        if entry.line is None:
+            return
+        label = entry.custom_label.get().strip()
+        entry.line.set_label(label if label else "_nolegend_")
+        self.refresh_legend()
+        if redraw:
+            self.canvas.draw_idle()
+
+    def refresh_legend(self):
         if any(f.custom_label.get().strip() for f in self.files):
             self.ax.legend(fontsize=18)
-
-        self.canvas.draw()
+        elif self.ax.get_legend() is not None:
+            self.ax.get_legend().remove()
  
 # === 5. Saving ===
     def save_plot(self):
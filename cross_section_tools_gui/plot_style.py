@@ -0,0 +1,49 @@
+from matplotlib.ticker import ScalarFormatter
+
+# Figure styling of cross_section_viewer_gui.py, shared with the headless renderer.
+
+LATEX_NAMES = {
+    "phi": r"\phi", "phia": r"\phi_{a}", "phib": r"\phi_{b}",
+    "phia_conj": r"\phi_{a}^{*}", "phib_conj": r"\phi_{b}^{*}",
+    "psi": r"\psi", "psia": r"\psi_{a}", "psib": r"\psi_{b}",
+    "psia_conj": r"\psi_{a}^{*}", "psib_conj": r"\psi_{b}^{*}",
+}
+
+def beautify_filename(filename):
+    name = filename.replace(".txt", "")
+    latex_parts = [LATEX_NAMES.get(part, part) for part in name.split("_")]
+    return r"$" + r" \, ".join(latex_parts) + r"$"
+
+def viewer_title(energy, folder):
+    try:
+        mr, sin_theta, lam = folder.split("_")
+        return fr"$\sqrt{{s}} = {energy}$ TeV, $M_r = {mr}$ GeV, $\sin\theta = {sin_theta}$, $\Lambda = {lam}$ GeV"
+    except ValueError:
+        return folder
+
+def plot_viewer_curve(ax, x, y, label, smoothed):
+    if smoothed:
+        line, = ax.plot(x, y, label=label)
+    else:
+        line, = ax.plot(x, y, marker='o', linestyle='-', label=label)
+    return line
+
+def setup_viewer_axes(ax):
+    ax.set_xlabel(r"$M_{\phi_b}$ [GeV]", fontsize=18)
+    ax.set_ylabel(r"$\sigma_\mathrm{process}$ [pb]", fontsize=18)
+    ax.grid(True)
+
+    formatter = ScalarFormatter(useMathText=True)
+    formatter.set_scientific(True)
+    formatter.set_powerlimits((0, 0))
+    ax.yaxis.set_major_formatter(formatter)
+
+def set_viewer_scales(ax, log_x=False, log_y=False):
+    ax.set_xscale('log' if log_x else 'linear')
+    ax.set_yscale('log' if log_y else 'linear')
+
+def style_viewer_axes(ax, title, log_x=False, log_y=False):
+    ax.set_title(title, fontsize=22)
+    setup_viewer_axes(ax)
+    set_viewer_scales(ax, log_x, log_y)
+    ax.legend(fontsize=13)
@@ -0,0 +1,71 @@
+import time
+import numpy as np
+
+# Interactive point dragging with blitting.
+# On press the figure is drawn once without the dragged line and the axes background is
+# cached; every motion event then only restores that background and redraws the one line.
+# Motion events are throttled to roughly the display refresh rate.
+
+class BlitDragger:
+    def __init__(self, canvas, ax, max_fps=60):
+        self.canvas = canvas
+        self.ax = ax
+        self.min_interval = 1.0 / max_fps
+        self.line = None
+        self.index = None
+        self.ydata = None
+        self.start_y = None
+        self.background = None
+        self.last_blit = 0.0
+
+    @property
+    def active(self):
+        return self.line is not None
+
+    def start(self, line, index):
+        self.line = line
+        self.index = index
+        self.ydata = np.array(line.get_ydata(), dtype=float)
+        self.start_y = self.ydata[index]
+
+        line.set_animated(True)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.blit()
+
+    def move(self, y):
+        if not self.active:
+            return
+        self.ydata[self.index] = y
+        now = time.perf_counter()
+        if now - self.last_blit >= self.min_interval:
+            self.blit()
+            self.last_blit = now
+
+    def blit(self):
+        self.line.set_ydata(self.ydata)
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.line)
+        self.canvas.blit(self.ax.bbox)
+
+    def finish(self):
+        # Returns the new y value of the dragged point, or None if it did not move.
+        # The final position is applied here since throttling may have skipped the last move.
+        if not self.active:
+            return None
+        new_y = self.ydata[self.index]
+        moved = new_y != self.start_y
+        self.line.set_ydata(self.ydata)
+        self.line.set_animated(False)
+        self.cancel()
+        self.canvas.draw_idle()
+        return new_y if moved else None
+
+    def cancel(self):
+        if self.line is not None:
+            self.line.set_animated(False)
+        self.line = None
+        self.index = None
+        self.ydata = None
+        self.start_y = None
+        self.background = None
@@ -0,0 +1,140 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from statsmodels.nonparametric.smoothers_lowess import lowess
+from scipy.interpolate import PchipInterpolator, UnivariateSpline
+
+# Smoothing methods shared by the GUIs ("LOWESS", "PCHIP", "Spline", "PolyFit").
+# Fitted curves are keyed on a hash of the input arrays plus the method parameters and kept
+# in an in-memory LRU and, optionally, as .npy files on disk, so a redraw with unchanged
+# data (log toggles, legend edits, reopening a session) never refits.
+
+METHODS = ["LOWESS", "PCHIP", "Spline", "PolyFit"]
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fit_cache")
+
+# === 1. Fitting ===
+def compute_fit(method, x, y, x_eval=None, frac=0.15, degree=5, extrapolate=True):
+    if method == "LOWESS":
+        x_s, y_s = lowess(y, x, frac=frac, return_sorted=True).T
+        if x_eval is None:
+            return x_s, y_s
+        return x_eval, np.interp(x_eval, x_s, y_s)
+
+    if x_eval is None:
+        x_eval = np.linspace(x.min(), x.max(), 1000)
+    if method == "PCHIP":
+        return x_eval, PchipInterpolator(x, y, extrapolate=extrapolate)(x_eval)
+    if method == "Spline":
+        return x_eval, UnivariateSpline(x, y, s=0.5)(x_eval)
+    if method == "PolyFit":
+        return x_eval, np.poly1d(np.polyfit(x, y, deg=degree))(x_eval)
+    raise ValueError(f"Unknown smoothing method: {method}")
+
+def fit_key(method, x, y, x_eval, frac, degree, extrapolate):
+    h = hashlib.sha1()
+    if method == "LOWESS":
+        params = f"{method}|frac={frac!r}"
+    elif method == "PCHIP":
+        params = f"{method}|extrapolate={bool(extrapolate)}"
+    elif method == "PolyFit":
+        params = f"{method}|deg={int(degree)}"
+    else:
+        params = method
+    h.update(params.encode())
+    for arr in (x, y) if x_eval is None else (x, y, x_eval):
+        arr = np.ascontiguousarray(arr, dtype=float)
+        h.update(str(arr.shape).encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+# === 2. Memoizing engine ===
+class SmoothingEngine:
+    def __init__(self, cache_dir=None, max_entries=512, max_disk_entries=5000, prune_every=256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = prune_every
+        self._saves = 0
+        self._fits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def smooth(self, method, x, y, x_eval=None, frac=0.15, degree=5, extrapolate=True):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        key = fit_key(method, x, y, x_eval, frac, degree, extrapolate)
+
+        with self._lock:
+            fit = self._fits.get(key)
+            if fit is not None:
+                self._fits.move_to_end(key)
+                return fit
+
+        fit = self._load_disk(key)
+        if fit is None:
+            x_s, y_s = compute_fit(method, x, y, x_eval, frac, degree, extrapolate)
+            fit = np.vstack([x_s, y_s])
+            self._save_disk(key, fit)
+        fit.setflags(write=False)
+
+        with self._lock:
+            self._fits[key] = fit
+            while len(self._fits) > self.max_entries:
+                self._fits.popitem(last=False)
+        return fit
+
+    def clear(self):
+        with self._lock:
+            self._fits.clear()
+
+# === 3. Disk cache ===
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _load_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            return np.load(self._disk_path(key))
+        except (OSError, ValueError):
+            return None
+
+    def _save_disk(self, key, fit):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._disk_path(key) + f".{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, fit)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError:
+            return  # the disk cache is only an optimisation
+
+        # Pruned on the first save (never on import) and every prune_every saves after it
+        with self._lock:
+            self._saves += 1
+            prune = (self._saves - 1) % self.prune_every == 0
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self):
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".npy")]
+        except OSError:
+            return
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+# === 4. Shared instance ===
+engine = SmoothingEngine(cache_dir=DEFAULT_CACHE_DIR)
+
+def smooth(method, x, y, x_eval=None, frac=0.15, degree=5, extrapolate=True):
+    return engine.smooth(method, x, y, x_eval=x_eval, frac=frac, degree=degree, extrapolate=extrapolate)
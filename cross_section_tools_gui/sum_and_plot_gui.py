@@ -1,14 +1,16 @@
 import os
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from statsmodels.nonparametric.smoothers_lowess import lowess
-from scipy.interpolate import PchipInterpolator, UnivariateSpline
-from matplotlib.ticker import FuncFormatter
-import shutil
+import data_cache
+import data_index
+import smoothing
+import sum_store
+import lod
+from point_drag import BlitDragger
+from compute_worker import ComputeWorker
+from edit_journal import JournalManager
 
 class EditableSumApp:
 # === 1. Initialization ===
@@ -34,7 +36,12 @@ class EditableSumApp:
         self.fix_x_max = tk.BooleanVar()
 
         self.dragging_point = None
+        self.lines = {}
         self.editable_lines = {}
+        self.data_index = data_index.DataIndex(os.path.dirname(os.path.abspath(__file__)))
+        self.worker = ComputeWorker(root)
+        self.journals = JournalManager(root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.build_interface()
 
@@ -54,9 +61,15 @@ class EditableSumApp:
         self.folder_list_panel = tk.LabelFrame(left_panel, text="Parameter Sets")
         self.folder_list_panel.pack(fill="both", expand=True, pady=(10, 0))
 
-        tk.Checkbutton(left_panel, text="Logarithmic X", variable=self.log_x, command=self.update_plot).pack(anchor="w")
-        tk.Checkbutton(left_panel, text="Logarithmic Y", variable=self.log_y, command=self.update_plot).pack(anchor="w")
-        tk.Checkbutton(left_panel, text="Edit Mode", variable=self.edit_mode, command=self.update_plot).pack(anchor="w", pady=(10, 0))
+        tk.Checkbutton(left_panel, text="Logarithmic X", variable=self.log_x, command=self.update_scales).pack(anchor="w")
+        tk.Checkbutton(left_panel, text="Logarithmic Y", variable=self.log_y, command=self.update_scales).pack(anchor="w")
+        tk.Checkbutton(left_panel, text="Edit Mode", variable=self.edit_mode, command=self.update_edit_mode).pack(anchor="w", pady=(10, 0))
+        edit_frame = tk.Frame(left_panel)
+        edit_frame.pack(anchor="w")
+        tk.Button(edit_frame, text="Undo", command=self.undo_edit).pack(side="left")
+        tk.Button(edit_frame, text="Redo", command=self.redo_edit).pack(side="left")
+        self.root.bind("<Control-z>", lambda event: self.undo_edit())
+        self.root.bind("<Control-y>", lambda event: self.redo_edit())
 
         tk.Label(left_panel, text="LOWESS frac:").pack(anchor="w", pady=(10, 0))
         tk.Scale(left_panel, from_=0.05, to=0.5, resolution=0.01, orient=tk.HORIZONTAL, variable=self.frac, command=lambda _: self.update_plot()).pack(fill="x")
@@ -80,6 +93,9 @@ class EditableSumApp:
         self.fig, self.ax = plt.subplots()
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
         self.canvas.get_tk_widget().pack(side="right", fill="both", expand=True)
+        self.dragger = BlitDragger(self.canvas, self.ax)
+        self.setup_axes()
+        self.lod = lod.LodLines(self.ax)
 
         self.canvas.mpl_connect('button_press_event', self.on_press)
         self.canvas.mpl_connect('motion_notify_event', self.on_motion)
@@ -94,158 +110,182 @@ class EditableSumApp:
     def refresh_folders(self):
         for widget in self.folder_list_panel.winfo_children():
             widget.destroy()
-        base_path = self.get_base_path()
-        names = set()
-
-        for state in ['2X', '3X', '4X']:
-            path = os.path.join(base_path, state)
-            if os.path.exists(path):
-                for name in os.listdir(path):
-                    if os.path.isdir(os.path.join(path, name)):
-                        names.add(name)
+        names = self.data_index.parameter_sets(self.process_type.get(), self.energy_choice.get(), ['2X', '3X', '4X'])
 
         self.selected_folders.clear()
         self.smoothing_methods.clear()
-        for name in sorted(names):
+        for name in names:
             frame = tk.Frame(self.folder_list_panel)
             frame.pack(anchor="w", fill="x")
             var = tk.BooleanVar()
             self.selected_folders[name] = var
             smooth_var = tk.StringVar(value="None")
             self.smoothing_methods[name] = smooth_var
-            tk.Checkbutton(frame, text=name, variable=var, command=self.update_plot).pack(side="left")
+            tk.Checkbutton(frame, text=name, variable=var, command=lambda n=name: self.update_folder(n)).pack(side="left")
             tk.OptionMenu(frame, smooth_var, "None", "LOWESS", "PCHIP", "Spline", "PolyFit", command=lambda _: self.update_plot()).pack(side="left")
 
+        self.journals.open(self.get_sum_path(name) for name in names)
         self.update_plot()
 
-    def collect_data(self, folder):
-        dfs = []
+    def collect_paths(self, folder):
+        paths = []
         for state in ['2X', '3X', '4X']:
-            path = os.path.join(self.get_base_path(), state, folder)
-            if os.path.exists(path):
-                for file in os.listdir(path):
-                    if file.endswith(".txt"):
-                        try:
-                            df = pd.read_csv(os.path.join(path, file), delim_whitespace=True, header=None)
-                            df.columns = ['Mass', 'CrossSection']
-                            dfs.append(df)
-                        except:
-                            continue
-        return dfs
+            files = self.data_index.channel_files(self.process_type.get(), self.energy_choice.get(), state, folder)
+            paths.extend(files.values())
+        return paths
 
     def get_sum_path(self, folder):
-        return os.path.join(self.get_base_path(), "Sum", f"{folder}.txt")
-
-    def save_sum_file(self, folder, x, y):
-        path = self.get_sum_path(folder)
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        df = pd.DataFrame({'Mass': x, 'CrossSection': y})
-        df.to_csv(path, sep=' ', header=False, index=False)
+        return sum_store.get_sum_path(self.get_base_path(), folder)
 
 # === 4. Plotting ===
-    def update_plot(self):
-        self.ax.clear()
-        self.editable_lines.clear()
-        selected = [name for name, var in self.selected_folders.items() if var.get()]
-        if not selected:
-            self.canvas.draw()
-            return
+    # Lines are kept between updates, keyed by parameter set. Data and visibility change in
+    # place; the lines are rebuilt only when the set of computed curves changes.
+    def setup_axes(self):
+        self.ax.set_xlabel("Mass [GeV]", fontsize=18)
+        self.ax.set_ylabel("Cross Section [pb]", fontsize=18)
+        self.ax.set_xscale('log' if self.log_x.get() else 'linear')
+        self.ax.set_yscale('log' if self.log_y.get() else 'linear')
+        self.ax.grid(True, which='both', linestyle=':', linewidth=0.7)
 
-        for name in selected:
-            sum_path = self.get_sum_path(name)
-            if os.path.exists(sum_path):
-                df = pd.read_csv(sum_path, delim_whitespace=True, header=None)
-                df.columns = ['Mass', 'CrossSection']
+    def update_plot(self):
+        # Snapshot the Tk state here; summation and smoothing run on the compute worker
+        requests = []
+        for name, var in self.selected_folders.items():
+            if var.get():
+                method = self.smoothing_methods.get(name, tk.StringVar(value="None")).get()
+                requests.append((name, self.get_sum_path(name), self.collect_paths(name), method))
+        settings = {
+            'x_min': self.x_min.get() if self.fix_x_min.get() else None,
+            'x_max': self.x_max.get() if self.fix_x_max.get() else None,
+            'frac': self.frac.get(),
+        }
+        self.worker.submit("plot", lambda: self.compute_curves(requests, settings), self.draw_curves)
+
+    def compute_sums(self, requests, settings):
+        # Rebuilds only the Sum/ files whose channel files or fixed X range changed
+        jobs = [(name, sum_path, paths) for name, sum_path, paths, _ in requests]
+        return sum_store.update_sums(jobs, settings['x_min'], settings['x_max'])
+
+    def compute_curves(self, requests, settings):
+        curves, failed = [], []
+        sums = self.compute_sums(requests, settings)
+        params = sum_store.grid_params(settings['x_min'], settings['x_max'])
+        for name, sum_path, paths, method in requests:
+            if name in sums:
+                x, y = sums[name]
+            elif sum_store.is_fresh(sum_path, paths, params):
+                x, y = data_cache.load_xy(sum_path)
             else:
-                dfs = self.collect_data(name)
-                if not dfs:
-                    continue
-                all_masses = np.concatenate([df['Mass'].values for df in dfs])
-                x_min, x_max = np.min(all_masses), np.max(all_masses)
-                if self.fix_x_min.get(): x_min = self.x_min.get()
-                if self.fix_x_max.get(): x_max = self.x_max.get()
-                x = np.linspace(x_min, x_max, 300)
-                y = np.zeros_like(x)
-                for df in dfs:
-                    y_interp = np.interp(x, df['Mass'], df['CrossSection'], left=0, right=0)
-                    y += y_interp
-                df = pd.DataFrame({'Mass': x, 'CrossSection': y})
-                self.save_sum_file(name, x, y)
-
-            x = df['Mass'].values
-            y = df['CrossSection'].values + 1e-10  # avoid log(0)
-            if self.fix_x_min.get(): mask = x >= self.x_min.get(); x, y = x[mask], y[mask]
-            if self.fix_x_max.get(): mask = x <= self.x_max.get(); x, y = x[mask], y[mask]
-
-            method = self.smoothing_methods.get(name, tk.StringVar(value="None")).get()
-            label = name
-            if method == "LOWESS":
-                x_s, y_s = lowess(y, x, frac=self.frac.get(), return_sorted=True).T
-                self.ax.plot(x_s, y_s, label=label, linewidth=3)
-            elif method == "PCHIP":
-                interp = PchipInterpolator(x, y)
-                x_s = np.linspace(x.min(), x.max(), 1000)
-                y_s = interp(x_s)
-                self.ax.plot(x_s, y_s, label=label, linewidth=3)
-            elif method == "Spline":
-                spline = UnivariateSpline(x, y, s=0.5)
-                x_s = np.linspace(x.min(), x.max(), 1000)
-                self.ax.plot(x_s, spline(x_s), label=label, linewidth=3)
-            elif method == "PolyFit":
-                coeffs = np.polyfit(x, y, deg=5)
-                poly = np.poly1d(coeffs)
-                x_s = np.linspace(x.min(), x.max(), 1000)
-                self.ax.plot(x_s, poly(x_s), label=label, linewidth=3)
+                failed.append(name)  # stale and no readable channel file to rebuild it from
+                continue
+
+            y = y + 1e-10  # avoid log(0)
+            if settings['x_min'] is not None: mask = x >= settings['x_min']; x, y = x[mask], y[mask]
+            if settings['x_max'] is not None: mask = x <= settings['x_max']; x, y = x[mask], y[mask]
+
+            editable_path = None
+            if method in smoothing.METHODS:
+                x, y = smoothing.smooth(method, x, y, frac=settings['frac'])
             else:
-                line, = self.ax.plot(x, y, label=label, linewidth=3)
-                if self.edit_mode.get():
-                    self.editable_lines[line] = {'df': df, 'path': self.get_sum_path(name)}
+                editable_path = sum_path
+
+            curves.append({'label': name, 'x': x, 'y': y, 'editable_path': editable_path})
+        return curves, failed
+
+    def draw_curves(self, result):
+        curves, failed = result
+        if failed:
+            messagebox.showwarning("Sum not updated",
+                                   "No readable channel files, so these sums could not be rebuilt "
+                                   f"and are not shown:\n{', '.join(failed)}")
+        self.dragging_point = None
+        self.dragger.cancel()
+
+        if [curve['label'] for curve in curves] != list(self.lines):
+            for line in self.lines.values():
+                line.remove()
+            self.lines.clear()
+            self.lod.clear()
+            self.ax.set_prop_cycle(None)
+            for curve in curves:
+                self.lines[curve['label']], = self.ax.plot([], [], label=curve['label'], linewidth=3)
+        for curve in curves:
+            self.lod.set_data(self.lines[curve['label']], curve['x'], curve['y'])
+        self.editable_lines = {self.lines[curve['label']]: {'path': curve['editable_path']}
+                               for curve in curves if curve['editable_path'] is not None}
 
         self.ax.set_title(
             rf"{self.process_type.get()} $\sqrt{{s}} = {self.energy_choice.get()}$ TeV",
             fontsize=20
             )
-        self.ax.set_xlabel("Mass [GeV]", fontsize=18)
-        self.ax.set_ylabel("Cross Section [pb]", fontsize=18)
+        self.refresh_view()
+
+    def refresh_view(self):
+        for name, line in self.lines.items():
+            var = self.selected_folders.get(name)
+            line.set_visible(var is not None and var.get())
+        visible = [line for line in self.lines.values() if line.get_visible()]
+
+        self.lod.relim(visible_only=True)
+        self.ax.autoscale_view()
+        if visible:
+            self.ax.legend(handles=visible)
+        elif self.ax.get_legend() is not None:
+            self.ax.get_legend().remove()
+        self.canvas.draw_idle()
+
+    def update_folder(self, name):
+        if name in self.lines:
+            self.refresh_view()  # already computed with the current settings: only show or hide it
+        else:
+            self.update_plot()
+
+    def update_scales(self):
         self.ax.set_xscale('log' if self.log_x.get() else 'linear')
         self.ax.set_yscale('log' if self.log_y.get() else 'linear')
-        self.ax.grid(True, which='both', linestyle=':', linewidth=0.7)
-        self.ax.legend()
-        self.canvas.draw()
+        self.refresh_view()
 
 # === 5. Editing ===
     def on_press(self, event):
         if not self.edit_mode.get() or event.inaxes != self.ax:
             return
         for line, info in self.editable_lines.items():
+            if not line.get_visible():
+                continue
             contains, attr = line.contains(event)
             if contains:
                 self.dragging_point = (line, attr['ind'][0])
+                self.dragger.start(*self.dragging_point)
                 return
 
     def on_motion(self, event):
         if not self.dragging_point or not self.edit_mode.get() or event.inaxes != self.ax:
             return
-        line, idx = self.dragging_point
-        xdata, ydata = list(line.get_xdata()), list(line.get_ydata())
-        ydata[idx] = max(event.ydata, 1e-10)
-        line.set_data(xdata, ydata)
-        self.canvas.draw()
+        self.dragger.move(max(event.ydata, 1e-10))
 
     def on_release(self, event):
         if not self.dragging_point: return
         line, idx = self.dragging_point
-        info = self.editable_lines[line]
-        df, path = info['df'], info['path']
-        x_mass = df.iloc[idx, 0]
-        new_val = max(event.ydata, 1e-10)
-        nearest_idx = (df['Mass'] - x_mass).abs().idxmin()
-        df.at[nearest_idx, 'CrossSection'] = new_val
-        backup = path + ".bak"
-        if not os.path.exists(backup):
-            shutil.copy2(path, backup)
-        df.to_csv(path, sep=' ', header=False, index=False)
         self.dragging_point = None
+        new_val = self.dragger.finish()
+        if new_val is None:
+            return
+        path = self.editable_lines[line]['path']
+        self.journals.record(path, line.get_xdata()[idx], new_val)
+        self.lod.set_point(line, idx, new_val)
+
+    def update_edit_mode(self):
+        # The lines stay as they are; edit mode only decides whether a click picks a point
+        self.dragging_point = None
+        self.dragger.cancel()
+
+    def undo_edit(self):
+        if self.journals.undo():
+            self.update_plot()
+
+    def redo_edit(self):
+        if self.journals.redo():
+            self.update_plot()
 
 # === 6. Save ===
     def save_plot_dialog(self):
@@ -266,9 +306,14 @@ class EditableSumApp:
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def on_close(self):
+        self.journals.flush_all()
+        self.worker.shutdown()
+        self.root.destroy()
+
 # === 7. Run ===
 if __name__ == "__main__":
     root = tk.Tk()
     root.geometry("1800x950")
     app = EditableSumApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import os
+import json
+import numpy as np
+import data_cache
+import summation
+
+# Derived Sum/<folder>.txt files with dependency tracking.
+# Next to every sum a Sum/<folder>.deps.json records the (path, mtime, size) of each channel
+# file that went into it and the grid parameters. A sum is reused only while all of these
+# still match; a changed, added or removed channel or a different fixed X range rebuilds it.
+
+SUM_DIR = "Sum"
+FINAL_STATES = ["2X", "3X", "4X"]
+GRID_POINTS = 300
+
+# === 1. Paths ===
+def get_sum_path(energy_dir, folder):
+    return os.path.join(energy_dir, SUM_DIR, f"{folder}.txt")
+
+def get_deps_path(sum_path):
+    return os.path.splitext(sum_path)[0] + ".deps.json"
+
+def find_channel_paths(energy_dir, folder):
+    paths = []
+    for state in FINAL_STATES:
+        folder_dir = os.path.join(energy_dir, state, folder)
+        if os.path.isdir(folder_dir):
+            paths.extend(sorted(e.path for e in os.scandir(folder_dir) if e.name.endswith(".txt") and e.is_file()))
+    return paths
+
+# === 2. Dependency records ===
+def grid_params(x_min=None, x_max=None):
+    return {"points": GRID_POINTS,
+            "x_min": None if x_min is None else float(x_min),
+            "x_max": None if x_max is None else float(x_max)}
+
+def describe_sources(sum_path, paths):
+    energy_dir = os.path.dirname(os.path.dirname(sum_path))
+    sources = []
+    for path in sorted(paths):
+        try:
+            mtime_ns, size = data_cache.file_stamp(path)
+        except OSError:
+            continue
+        sources.append([os.path.relpath(path, energy_dir).replace(os.sep, "/"), mtime_ns, size])
+    return sources
+
+def is_fresh(sum_path, paths, params):
+    try:
+        with open(get_deps_path(sum_path), "r") as f:
+            deps = json.load(f)
+    except (OSError, ValueError):
+        return False  # no record (e.g. a sum from before dependency tracking)
+    if not os.path.exists(sum_path):
+        return False
+    return deps.get("params") == params and deps.get("sources") == describe_sources(sum_path, paths)
+
+# === 3. Building ===
+def write_sum(sum_path, x, y, sources, params):
+    os.makedirs(os.path.dirname(sum_path), exist_ok=True)
+    with data_cache.write_lock(sum_path):
+        data_cache.write_xy(sum_path, x, y)
+        deps_path = get_deps_path(sum_path)
+        tmp_path = data_cache.temp_path(deps_path)
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "params": params, "sources": sources}, f)
+        os.replace(tmp_path, deps_path)
+
+def update_sums(jobs, x_min=None, x_max=None, force=False):
+    # jobs: [(name, sum_path, channel_paths)]. Rebuilds every stale sum in one batched
+    # summation and returns {name: (x, y)} for the sums that were (re)computed.
+    params = grid_params(x_min, x_max)
+    channel_sets, grids, sources = {}, {}, {}
+    for name, sum_path, paths in jobs:
+        if not force and is_fresh(sum_path, paths, params):
+            continue
+        # Stamp the inputs before reading them so a concurrent edit leaves the sum stale
+        sources[name] = describe_sources(sum_path, paths)
+        channels = []
+        for path in paths:
+            try:
+                channels.append(data_cache.load_xy(path))
+            except (OSError, ValueError):
+                continue
+        if not channels:
+            continue
+        x_lo = min(mass.min() for mass, _ in channels) if x_min is None else x_min
+        x_hi = max(mass.max() for mass, _ in channels) if x_max is None else x_max
+        channel_sets[name] = channels
+        grids[name] = np.linspace(x_lo, x_hi, params["points"])
+
+    sums = summation.sum_parameter_sets(channel_sets, grids, left=0, right=0)
+    for name, sum_path, _ in jobs:
+        if name in sums:
+            write_sum(sum_path, *sums[name], sources[name], params)
+    return sums
@@ -0,0 +1,72 @@
+import numpy as np
+
+# Summation of cross-section channels on a common mass grid.
+# A channel is a (mass, cross_section) pair of 1D arrays with increasing mass.
+# All channels of a parameter set are packed into one 2D array and summed with a single
+# reduction. When every channel shares the same mass axis (the usual CompHEP output) no
+# per-channel interpolation is done at all: linear interpolation commutes with the sum,
+# so at most the summed curve is interpolated once onto the requested grid.
+
+# === 1. Helpers ===
+def shared_axis(channels):
+    axis = channels[0][0]
+    for mass, _ in channels[1:]:
+        if mass.shape != axis.shape or not np.array_equal(mass, axis):
+            return None
+    return axis
+
+def union_grid(channels):
+    return np.unique(np.concatenate([mass for mass, _ in channels]))
+
+def channel_matrix(channels, grid, left=None, right=None):
+    matrix = np.empty((len(channels), len(grid)))
+    for row, (mass, cross_section) in zip(matrix, channels):
+        row[:] = np.interp(grid, mass, cross_section, left=left, right=right)
+    return matrix
+
+def on_grid(axis, total, grid, left=None, right=None):
+    if grid is None or (grid.shape == axis.shape and np.array_equal(grid, axis)):
+        return axis, total
+    return grid, np.interp(grid, axis, total, left=left, right=right)
+
+# === 2. One parameter set ===
+def sum_channels(channels, grid=None, left=None, right=None):
+    # Without a grid the result lives on the union of all mass axes.
+    # left/right are passed on to np.interp (None = hold the edge value).
+    if not channels:
+        raise ValueError("No channels to sum")
+
+    axis = shared_axis(channels)
+    if axis is not None:
+        total = np.vstack([cross_section for _, cross_section in channels]).sum(axis=0)
+        return on_grid(axis, total, grid, left, right)
+
+    if grid is None:
+        grid = union_grid(channels)
+    return grid, channel_matrix(channels, grid, left, right).sum(axis=0)
+
+# === 3. Many parameter sets in one call ===
+def sum_parameter_sets(channel_sets, grids=None, left=None, right=None):
+    # channel_sets: {name: [channels]}; grids: optional {name: grid}.
+    # Sets whose channels share one mass axis are grouped by that axis; each group is
+    # stacked into a single (all channels x points) array and reduced with np.add.reduceat.
+    grids = grids or {}
+    results = {}
+    groups = {}
+    for name, channels in channel_sets.items():
+        if not channels:
+            continue
+        axis = shared_axis(channels)
+        if axis is None:
+            results[name] = sum_channels(channels, grids.get(name), left, right)
+        else:
+            groups.setdefault((axis.shape, axis.tobytes()), (axis, []))[1].append(name)
+
+    for axis, names in groups.values():
+        rows = [cross_section for name in names for _, cross_section in channel_sets[name]]
+        counts = [len(channel_sets[name]) for name in names]
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        totals = np.add.reduceat(np.vstack(rows), offsets, axis=0)
+        for name, total in zip(names, totals):
+            results[name] = on_grid(axis, total, grids.get(name), left, right)
+    return results
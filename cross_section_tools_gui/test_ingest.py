@@ -0,0 +1,59 @@
+import os
+import json
+import tempfile
+import unittest
+import ingest
+
+# python -m unittest test_ingest   (from cross_section_tools_gui/)
+
+def make_run(start, name, n_hists=2):
+    results = os.path.join(start, name, "results")
+    os.makedirs(results)
+    for k in range(1, n_hists + 1):
+        with open(os.path.join(results, f"hist1d_{k}.txt"), "w") as f:
+            f.write(f"{name} {k}\n")
+
+class PlanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.start = self.tmp.name
+        self.output = os.path.join(self.start, "out")
+        self.defaults = {"process": "pair production", "energy": "14", "final_state": "2X",
+                         "m_r": "150", "sin_theta": "0.01", "lambda": "3000"}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_config(self, runs):
+        path = os.path.join(self.start, "ingest.json")
+        with open(path, "w") as f:
+            json.dump({"defaults": self.defaults, "runs": runs}, f)
+        return path
+
+    def test_glob_runs_with_same_target_are_rejected(self):
+        make_run(self.start, os.path.join("night_1", "comphep_5"))
+        make_run(self.start, os.path.join("night_2", "comphep_5"))
+        runs = ingest.expand_runs({"defaults": self.defaults, "runs": [{"folder": "night_*/comphep_5"}]}, self.start)
+        with self.assertRaises(ingest.ConfigError) as ctx:
+            ingest.plan(runs, self.output)
+        self.assertIn("phib_phib_conj.txt", str(ctx.exception))
+
+    def test_main_leaves_sources_alone_on_collision(self):
+        make_run(self.start, "comphep_7")
+        make_run(self.start, "comphep_8")
+        config = self.write_config([{"folder": "comphep_7"}, {"folder": "comphep_8"}])
+        self.assertEqual(ingest.main([config, "--mode", "move", "--output", self.output]), 2)
+        for name in ["comphep_7", "comphep_8"]:
+            self.assertEqual(len(os.listdir(os.path.join(self.start, name, "results"))), 2)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_distinct_targets_are_planned(self):
+        make_run(self.start, "comphep_7")
+        make_run(self.start, "comphep_8")
+        runs = ingest.expand_runs({"defaults": self.defaults,
+                                   "runs": [{"folder": "comphep_7"}, {"folder": "comphep_8", "m_r": "200"}]}, self.start)
+        jobs = ingest.plan(runs, self.output)
+        self.assertEqual(len({dst for _, _, dst in jobs}), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import queue
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+# Background transfer of histogram files for file_sort_gui.py.
+# "move" renames the file when source and target are on the same filesystem (no data is
+# copied) and falls back to copy + delete across devices. "link" makes a hard link on the
+# same filesystem and copies otherwise; the originals stay, sharing their data with the
+# target, so it is only safe for sources that are never rewritten in place. "copy" always
+# copies. Progress is handed back to the Tk thread through root.after(), in batches.
+
+MODES = ["copy", "move", "link"]
+
+# === 1. Single file ===
+def same_device(src, dst):
+    try:
+        return os.stat(src).st_dev == os.stat(os.path.dirname(os.path.abspath(dst))).st_dev
+    except OSError:
+        return False
+
+def transfer_file(src, dst, mode="copy"):
+    # Returns how the file got there: "renamed", "linked" or "copied"
+    if mode == "move":
+        if same_device(src, dst):
+            os.replace(src, dst)
+            return "renamed"
+        shutil.copy2(src, dst)
+        os.remove(src)
+        return "copied"
+
+    if mode == "link" and same_device(src, dst):
+        try:
+            if os.path.lexists(dst):
+                os.remove(dst)
+            os.link(src, dst)
+            return "linked"
+        except OSError:
+            pass  # no hard links on this filesystem
+
+    shutil.copy2(src, dst)
+    return "copied"
+
+# === 2. Many files off the Tk thread ===
+class TransferEngine:
+    def __init__(self, root, max_workers=8, poll_ms=50):
+        self.root = root
+        self.max_workers = max_workers
+        self.poll_ms = poll_ms
+        self.events = queue.Queue()
+        self.executor = None
+        self.total = 0
+        self.done = 0
+        self.results = []
+        self.on_progress = None
+        self.on_done = None
+        self.prepare = None
+
+    @property
+    def running(self):
+        return self.executor is not None
+
+    def start(self, jobs, mode, on_progress, on_done, prepare=None):
+        # jobs: [(label, src, dst)]; on_progress(events) gets a list of
+        # (label, src, dst, how, error, info) per poll, on_done(events) all of them at the end.
+        # prepare(src), if given, runs in the worker before the transfer and its result is info.
+        if self.running:
+            raise RuntimeError("A transfer is already running")
+        self.total = len(jobs)
+        self.done = 0
+        self.results = []
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.prepare = prepare
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transfer")
+        for label, src, dst in jobs:
+            self.executor.submit(self.run_job, label, src, dst, mode)
+        self.root.after(self.poll_ms, self.poll)
+
+    def run_job(self, label, src, dst, mode):
+        try:
+            info = self.prepare(src) if self.prepare is not None else None
+            self.events.put((label, src, dst, transfer_file(src, dst, mode), None, info))
+        except Exception as e:
+            self.events.put((label, src, dst, None, e, None))
+
+    def poll(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        self.done += len(batch)
+        self.results.extend(batch)
+
+        try:
+            if batch:
+                self.on_progress(batch)
+        except Exception as e:
+            self.root.report_callback_exception(type(e), e, e.__traceback__)
+
+        if self.done < self.total:
+            self.root.after(self.poll_ms, self.poll)
+            return
+        self.executor.shutdown(wait=False)
+        self.executor = None
+        try:
+            self.on_done(self.results)
+        except Exception as e:
+            self.root.report_callback_exception(type(e), e, e.__traceback__)
@@ -0,0 +1,106 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from scipy.interpolate import PchipInterpolator, PPoly
+
+# Upper limits on the direct-detection cross section, sigma_exp(m_exp), of one or more
+# experiments. Each curve is a PCHIP interpolant (optionally in log10-log10 space) whose
+# piecewise-polynomial coefficients are cached in .limits_cache/, so a source workbook is
+# parsed once and not on every run. Evaluation is one vectorized call over an array of
+# masses and gives NaN outside the measured mass range. Calling an ExperimentLimits object
+# returns the strongest (lowest) limit of all loaded experiments at each mass.
+# Experiments are named after their file (without folder and extension); two curves with
+# the same name are rejected rather than one silently replacing the other.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".limits_cache")
+
+# === 1. One experiment ===
+class LimitCurve:
+    def __init__(self, name, breakpoints, coefficients, mass_range, log_space=False):
+        self.name = name
+        self.log_space = log_space
+        self.poly = PPoly.construct_fast(coefficients, breakpoints)
+        self.m_min, self.m_max = mass_range
+
+    @classmethod
+    def from_points(cls, name, mass_exp, sigma_exp, log_space=False):
+        order = np.argsort(mass_exp, kind="stable")
+        mass_exp = np.asarray(mass_exp, dtype=np.float64)[order]
+        sigma_exp = np.asarray(sigma_exp, dtype=np.float64)[order]
+        mass_range = (mass_exp[0], mass_exp[-1])
+        if log_space:
+            mass_exp, sigma_exp = np.log10(mass_exp), np.log10(sigma_exp)
+        interp = PchipInterpolator(mass_exp, sigma_exp)
+        return cls(name, interp.x, interp.c, mass_range, log_space)
+
+    def __call__(self, masses):
+        masses = np.asarray(masses, dtype=np.float64)
+        inside = (masses >= self.m_min) & (masses <= self.m_max)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x = np.log10(masses) if self.log_space else masses
+            sigma = self.poly(x)
+            if self.log_space:
+                sigma = 10.0 ** sigma
+        return np.where(inside, sigma, np.nan)
+
+# === 2. Loading with an on-disk cache ===
+def read_points(path, sheet_name="1"):
+    if path.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(path, sheet_name=sheet_name)
+        return df["m_exp"].to_numpy(dtype=np.float64), df["sigma_exp"].to_numpy(dtype=np.float64)
+    # Plain text: two whitespace-separated columns m_exp sigma_exp
+    df = pd.read_csv(path, sep=r"\s+", header=None, usecols=[0, 1], comment="#", dtype=np.float64)
+    return df[0].to_numpy(), df[1].to_numpy()
+
+def load_curve(path, sheet_name="1", name=None, log_space=False, cache_dir=None):
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    st = os.stat(path)
+    key = hashlib.sha1(repr((os.path.abspath(path), st.st_mtime_ns, st.st_size, str(sheet_name), log_space)).encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, key + ".npz")
+    try:
+        with np.load(cache_path) as data:
+            return LimitCurve(name, data["x"], data["c"], tuple(data["mass_range"]), log_space)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    curve = LimitCurve.from_points(name, *read_points(path, sheet_name), log_space=log_space)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path + ".tmp", "wb") as f:
+            np.savez(f, x=curve.poly.x, c=curve.poly.c, mass_range=[curve.m_min, curve.m_max])
+        os.replace(cache_path + ".tmp", cache_path)
+    except OSError:
+        pass  # read-only location: just do without the cache
+    return curve
+
+# === 3. Several experiments ===
+class ExperimentLimits:
+    def __init__(self, curves=()):
+        self.curves = {}
+        for curve in curves:
+            self.add(curve)
+
+    @classmethod
+    def load(cls, paths, sheet_name="1", log_space=False, cache_dir=None):
+        return cls(load_curve(path, sheet_name, log_space=log_space, cache_dir=cache_dir) for path in paths)
+
+    def add(self, curve):
+        if curve.name in self.curves:
+            raise ValueError(f"several limits named '{curve.name}'")
+        self.curves[curve.name] = curve
+
+    def evaluate(self, masses):
+        # {experiment: limits at masses}
+        return {name: curve(masses) for name, curve in self.curves.items()}
+
+    def envelope(self, masses):
+        # Strongest limit at each mass; NaN where no experiment covers it
+        masses = np.asarray(masses, dtype=np.float64)
+        if not self.curves:
+            return np.full(masses.shape, np.nan)
+        return np.fmin.reduce([curve(masses) for curve in self.curves.values()])
+
+    def __call__(self, masses):
+        return self.envelope(masses)
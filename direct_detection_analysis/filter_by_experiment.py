@@ -1,109 +1,129 @@
 import os
-import numpy as np
-import pandas as pd
+import sys
+import glob
+import time
+import argparse
 import matplotlib.pyplot as plt
-from scipy.interpolate import PchipInterpolator
-from pathlib import Path
-
-# === 1. Load experimental limits from Excel ===
-df_exp = pd.read_excel("lux_zeplin.xlsx", sheet_name="1").sort_values("m_exp").reset_index(drop=True)
-mass_exp = df_exp["m_exp"].values
-sigma_exp = df_exp["sigma_exp"].values
-sigma_interp = PchipInterpolator(mass_exp, sigma_exp)
-
-def get_sigma_limit(m):
-    return sigma_interp(m) if mass_exp.min() <= m <= mass_exp.max() else np.nan
-
-# === 2. Read model data from CompHEP output ===
-input_folder = "./example_data_direct_detection/150"
-folder_name = os.path.basename(input_folder)
-
-model_rows = []
-for filename in os.listdir(input_folder):
-    if not filename.endswith(".txt"):
-        continue
-
-    try:
-        m_val = float(filename.replace(".txt", ""))
-    except ValueError:
-        continue
-
-    with open(os.path.join(input_folder, filename), "r") as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) < 3:
-                continue
-
-            lam, sin_theta, sigma_model = parts[:3]
-            if sigma_model.lower() in {"-nan", "nan"}:
-                continue
-
-            try:
-                model_rows.append({
-                    "m_hi": m_val,
-                    "lambda": float(lam),
-                    "sin": float(sin_theta),
-                    "sigma_model": float(sigma_model)
-                })
-            except ValueError:
-                continue
-
-df_model = pd.DataFrame(model_rows).sort_values(["m_hi", "lambda", "sin"]).reset_index(drop=True)
-print(f"Read {len(df_model)} rows from '{folder_name}'.")
-
-# === 3. Filter data based on experimental constraint ===
-filtered_rows = []
-
-for (m_val, lam_val), group in df_model.groupby(["m_hi", "lambda"]):
-    sigma_limit = get_sigma_limit(m_val)
-
-    if pd.isna(sigma_limit):
-        chosen_sin = 0.0
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from model_io import read_model_folder
+from sin_selection import select_sin, select_sin_streaming
+from experiment_limits import ExperimentLimits
+from results_store import ResultsStore, BACKENDS, DEFAULT_STORE, export_excel
+
+# Filters one or more M_r folders of CompHEP output against the LUX-ZEPLIN limit
+# (or the strongest of several experimental limits, see experiment_limits.py).
+#
+#   python filter_by_experiment.py                                   # ./example_data_direct_detection/150
+#   python filter_by_experiment.py "scans/*" --workers 8 --no-plot  # every M_r folder, headless
+
+# === 1. Filtering of one M_r folder ===
+sigma_limit = None  # set once per worker process by init_worker
+
+def init_worker(limit):
+    global sigma_limit
+    sigma_limit = limit
+
+def filter_folder(input_folder, chunk_rows=None):
+    if chunk_rows:
+        return select_sin_streaming(input_folder, sigma_limit, chunk_rows)
+    df_model = read_model_folder(input_folder)
+    df_filtered = select_sin(df_model, sigma_limit)
+    return df_filtered, len(df_model)
+
+# === 2. Output ===
+def plot_filtered(df_filtered, folder_name):
+    fig = plt.figure()
+    ax = fig.add_subplot(111, projection="3d")
+    ax.scatter(df_filtered["m_hi"], df_filtered["lambda"], df_filtered["sin"],
+               color="blue", marker="^", s=20, alpha=0.9 )
+    ax.set_xlabel("m_hi")
+    ax.set_ylabel("lambda")
+    ax.set_zlabel("sin(theta)")
+    ax.set_title(f"Filtered results from folder '{folder_name}'")
+    return fig
+
+# === 3. Command line ===
+def expand_folders(patterns):
+    folders = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        folders.extend(path for path in matches if os.path.isdir(path))
+    return folders
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Select sin(theta) per (m_hi, lambda) allowed by the LUX-ZEPLIN limit.")
+    parser.add_argument("folders", nargs="*", default=["./example_data_direct_detection/150"],
+                        help="M_r folders with <m_hi>.txt grid files, glob patterns allowed")
+    parser.add_argument("--limits", action="append", metavar="FILE",
+                        help="experimental limit (Excel with m_exp / sigma_exp, or two-column text), "
+                             "repeat for several experiments: the strongest limit at each mass is used "
+                             "(default: lux_zeplin.xlsx)")
+    parser.add_argument("--limits-sheet", default="1", help="sheet of the limit in Excel files")
+    parser.add_argument("--log-space", action="store_true", help="interpolate the limits in log10(m)-log10(sigma)")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="results store folder, one file per M_r")
+    parser.add_argument("--format", choices=list(BACKENDS), help="file format of a new results store (default: npz)")
+    parser.add_argument("--excel", metavar="XLSX", help="also export the filtered M_r to this workbook")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--no-plot", action="store_true", help="do not open the 3D plots (headless runs)")
+    parser.add_argument("--stream", action="store_true",
+                        help="read the grid files in chunks instead of loading a whole M_r folder (bounded memory)")
+    parser.add_argument("--chunk-rows", type=int, default=200_000, help="rows per chunk with --stream")
+    args = parser.parse_args(argv)
+
+    folders = expand_folders(args.folders)
+    if not folders:
+        parser.error("no M_r folders found")
+    names = [os.path.basename(os.path.normpath(folder)) for folder in folders]
+    if len(set(names)) != len(names):
+        parser.error("several folders share the same M_r name: " + ", ".join(sorted(set(n for n in names if names.count(n) > 1))))
+
+    limit_files = args.limits or ["lux_zeplin.xlsx"]
+    limit_names = [os.path.splitext(os.path.basename(path))[0] for path in limit_files]
+    if len(set(limit_names)) != len(limit_names):
+        parser.error("several limit files share the same name: " + ", ".join(sorted(set(n for n in limit_names if limit_names.count(n) > 1))))
+
+    store = ResultsStore(args.store, args.format)
+    limit = ExperimentLimits.load(limit_files, args.limits_sheet, log_space=args.log_space)
+    chunk_rows = max(1, args.chunk_rows) if args.stream else None
+    started = time.perf_counter()
+    results, failed = {}, []
+
+    def collect(folder_name, get_result):
+        # One bad M_r folder is reported and skipped; the others are still written
+        try:
+            results[folder_name], n_rows = get_result()
+        except Exception as e:
+            failed.append(folder_name)
+            print(f"Error filtering '{folder_name}': {e}", file=sys.stderr)
+            return
+        print(f"Read {n_rows} rows from '{folder_name}', {len(results[folder_name])} (m, lambda) pairs.")
+
+    workers = max(1, min(args.workers, len(folders)))
+    if workers == 1:
+        init_worker(limit)
+        for folder, folder_name in zip(folders, names):
+            collect(folder_name, lambda: filter_folder(folder, chunk_rows))
     else:
-        passed = group[group["sigma_model"] <= sigma_limit]
-
-        if passed.empty:
-            chosen_sin = 0.0
-        else:
-            positive = passed[passed["sin"] > 0]
-            negative = passed[passed["sin"] < 0]
-
-            if not positive.empty and len(positive) > len(negative):
-                chosen_sin = positive["sin"].max()
-            elif not negative.empty:
-                chosen_sin = abs(negative["sin"].min())
-            else:
-                chosen_sin = 0.0
-
-    filtered_rows.append({
-        "m_hi": m_val,
-        "lambda": lam_val,
-        "sin": chosen_sin
-    })
-
-df_filtered = pd.DataFrame(filtered_rows).sort_values(["m_hi", "lambda"]).reset_index(drop=True)
-print(f"Final dataset: {len(df_filtered)} rows (1 per (m, lambda) pair).")
-
-# === 4. Visualize as 3D plot ===
-fig = plt.figure()
-ax = fig.add_subplot(111, projection="3d")
-ax.scatter(df_filtered["m_hi"], df_filtered["lambda"], df_filtered["sin"],
-           color="blue", marker="^", s=20, alpha=0.9 )
-ax.set_xlabel("m_hi")
-ax.set_ylabel("lambda")
-ax.set_zlabel("sin(theta)")
-ax.set_title(f"Filtered results from folder '{folder_name}'")
-ax.legend()
-plt.show()
-
-# === 5. Write to Excel ===
-output_file = "filtered_results.xlsx"
-output_path = Path(output_file)
-
-if output_path.exists():
-    writer = pd.ExcelWriter(output_path, engine="openpyxl", mode="a", if_sheet_exists="replace")
-else:
-    writer = pd.ExcelWriter(output_path, engine="openpyxl", mode="w")  # без if_sheet_exists!
-
-with writer:
-    df_filtered.to_excel(writer, sheet_name=folder_name, index=False)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(limit,)) as pool:
+            futures = {pool.submit(filter_folder, folder, chunk_rows): folder_name for folder, folder_name in zip(folders, names)}
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+    names = [folder_name for folder_name in names if folder_name in results]
+    results = {folder_name: results[folder_name] for folder_name in names}
+    print(f"Filtered {len(results)} of {len(folders)} folders in {time.perf_counter() - started:.2f} s.")
+
+    for folder_name, df_filtered in results.items():
+        store.write(folder_name, df_filtered)
+    print(f"Results written to '{args.store}'.")
+    if args.excel and names:
+        export_excel(store, args.excel, names)
+        print(f"Exported to '{args.excel}'.")
+
+    if not args.no_plot:
+        for folder_name, df_filtered in results.items():
+            plot_filtered(df_filtered, folder_name)
+        plt.show()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
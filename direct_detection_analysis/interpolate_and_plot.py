@@ -1,9 +1,22 @@
+import os
+import sys
+import time
+import argparse
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.interpolate import griddata
 from scipy.ndimage import gaussian_filter
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.ticker import MaxNLocator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from results_store import ResultsStore, DEFAULT_STORE
+from surface_interp import interpolate_surface
+
+# Smoothed sin(theta) surface over (m_hi, lambda) for one or more M_r.
+#
+#   python interpolate_and_plot.py                     # M_r = 150, opens the plots, saves 150.png
+#   python interpolate_and_plot.py --all --workers 8  # every M_r, PNGs only (no windows)
 
 # === Configuration parameters ===
 sheet_name = "150"              # Excel sheet name corresponding to radion mass
@@ -14,70 +27,141 @@ smoothing_sigma = 1             # Gaussian smoothing strength
 sin_threshold = 0.20            # Max allowed value for sin(theta) in plot
 
 # === 1. Load filtered data ===
-df = pd.read_excel("filtered_results.xlsx", sheet_name=sheet_name)
-
-# Remove outliers based on quantiles
-q_low = df["sin"].quantile(outlier_low)
-q_high = df["sin"].quantile(outlier_high)
-df_clean = df[(df["sin"] >= q_low) & (df["sin"] <= q_high)].reset_index(drop=True)
-
-# === 2. Create regular interpolation grid ===
-mass_range = np.linspace(df_clean["m_hi"].min(), df_clean["m_hi"].max(), grid_size)
-lambda_range = np.linspace(df_clean["lambda"].min(), df_clean["lambda"].max(), grid_size)
-X, Y = np.meshgrid(mass_range, lambda_range)
-
-# === 3. Interpolate sin(theta) over the grid ===
-points = df_clean[["m_hi", "lambda"]].values
-values = df_clean["sin"].values
-Z = griddata(points, values, (X, Y), method='cubic')
-
-# === 4. Apply Gaussian smoothing (optional) ===
-Z_smooth = gaussian_filter(Z, sigma=smoothing_sigma)
-
-# === 5. Apply threshold mask ===
-Z_masked = np.minimum(Z_smooth, sin_threshold)
-
-# === 6. Plot the interpolated surface ===
-fig1 = plt.figure(figsize=(8, 6), dpi=150)
-ax1 = fig1.add_subplot(111, projection='3d')
-ax1.set_box_aspect([1, 1, 1], zoom=0.95)
-
-surf = ax1.plot_surface(
-    X, Y, Z_masked,
-    cmap="viridis",
-    edgecolor="none",
-    alpha=0.9
-)
-
-ax1.set_xlabel(r"$m_{\mathrm{hi}}$ [GeV]")
-ax1.set_ylabel(r"$\Lambda$ [GeV]")
-ax1.set_zlabel(r"$\sin\theta$", labelpad=4)
-ax1.set_title(rf"$M_r = {sheet_name}$ GeV")
-
-# Optional: adjust z-axis limit based on mass
-if int(sheet_name) == 500:
-    ax1.set_zlim(0, 0.1)
-elif int(sheet_name) in [150, 100]:
-    ax1.set_zlim(0, 0.2)
-
-ax1.xaxis.set_major_locator(MaxNLocator(nbins=6))
-ax1.yaxis.set_major_locator(MaxNLocator(nbins=5))
-ax1.zaxis.set_major_locator(MaxNLocator(nbins=4))
-
-# === 7. Plot raw filtered data points ===
-fig2 = plt.figure()
-ax2 = fig2.add_subplot(111, projection='3d')
-ax2.scatter(
-    df_clean["m_hi"], df_clean["lambda"], df_clean["sin"],
-    color="red", marker="o", s=10
-)
-ax2.set_xlabel(r"$m_{\mathrm{hi}}$ [GeV]")
-ax2.set_ylabel(r"$\Lambda$ [GeV]")
-ax2.set_zlabel(r"$\sin\theta$")
-ax2.set_title(rf"Filtered data points ($M_r = {sheet_name}$ GeV)")
-
-plt.show()
-
-# === 8. Save plots ===
-fig1.savefig(f"{sheet_name}.png", dpi=300, bbox_inches="tight")
-print(f"Saved plots: {sheet_name}.png.png")
+def load_sheet(sheet_name, store_path=DEFAULT_STORE, excel_path="filtered_results.xlsx"):
+    store = ResultsStore(store_path)
+    if sheet_name in store:
+        return store.read(sheet_name)
+    return pd.read_excel(excel_path, sheet_name=sheet_name)  # results from before the store
+
+def all_sheets(store_path=DEFAULT_STORE, excel_path="filtered_results.xlsx"):
+    sheets = ResultsStore(store_path).keys()
+    if os.path.exists(excel_path):
+        sheets += [name for name in pd.ExcelFile(excel_path).sheet_names if name not in sheets]
+    return sheets
+
+# === 2. Interpolate and smooth ===
+def make_surface(df, grid_size=grid_size, smoothing_sigma=smoothing_sigma):
+    # Remove outliers based on quantiles
+    q_low = df["sin"].quantile(outlier_low)
+    q_high = df["sin"].quantile(outlier_high)
+    keep = (df["sin"] >= q_low) & (df["sin"] <= q_high)
+    df_clean = df[keep].reset_index(drop=True)
+
+    # Regular interpolation grid
+    mass_range = np.linspace(df_clean["m_hi"].min(), df_clean["m_hi"].max(), grid_size)
+    lambda_range = np.linspace(df_clean["lambda"].min(), df_clean["lambda"].max(), grid_size)
+    X, Y = np.meshgrid(mass_range, lambda_range)
+
+    # Interpolate sin(theta) over the grid; the removed outliers stay in as NaN nodes so a
+    # rectilinear m_hi x lambda grid is still recognised as one
+    points = df[["m_hi", "lambda"]].values
+    values = df["sin"].where(keep).values
+    Z = interpolate_surface(points, values, X, Y)
+
+    # Gaussian smoothing and threshold mask
+    Z_smooth = gaussian_filter(Z, sigma=smoothing_sigma)
+    Z_masked = np.minimum(Z_smooth, sin_threshold)
+    return X, Y, Z_masked, df_clean
+
+# === 3. Figures ===
+def draw_surface(fig, X, Y, Z_masked, sheet_name):
+    ax1 = fig.add_subplot(111, projection='3d')
+    ax1.set_box_aspect([1, 1, 1], zoom=0.95)
+
+    surf = ax1.plot_surface(
+        X, Y, Z_masked,
+        cmap="viridis",
+        edgecolor="none",
+        alpha=0.9
+    )
+
+    ax1.set_xlabel(r"$m_{\mathrm{hi}}$ [GeV]")
+    ax1.set_ylabel(r"$\Lambda$ [GeV]")
+    ax1.set_zlabel(r"$\sin\theta$", labelpad=4)
+    ax1.set_title(rf"$M_r = {sheet_name}$ GeV")
+
+    # Optional: adjust z-axis limit based on mass
+    if float(sheet_name) == 500:
+        ax1.set_zlim(0, 0.1)
+    elif float(sheet_name) in [150, 100]:
+        ax1.set_zlim(0, 0.2)
+
+    ax1.xaxis.set_major_locator(MaxNLocator(nbins=6))
+    ax1.yaxis.set_major_locator(MaxNLocator(nbins=5))
+    ax1.zaxis.set_major_locator(MaxNLocator(nbins=4))
+    return surf
+
+def draw_points(fig, df_clean, sheet_name):
+    ax2 = fig.add_subplot(111, projection='3d')
+    ax2.scatter(
+        df_clean["m_hi"], df_clean["lambda"], df_clean["sin"],
+        color="red", marker="o", s=10
+    )
+    ax2.set_xlabel(r"$m_{\mathrm{hi}}$ [GeV]")
+    ax2.set_ylabel(r"$\Lambda$ [GeV]")
+    ax2.set_zlabel(r"$\sin\theta$")
+    ax2.set_title(rf"Filtered data points ($M_r = {sheet_name}$ GeV)")
+
+def render_sheet(sheet_name, out_dir, store_path, excel_path, grid_size, smoothing_sigma):
+    # Worker process: Agg canvas only, no window
+    X, Y, Z_masked, _ = make_surface(load_sheet(sheet_name, store_path, excel_path), grid_size, smoothing_sigma)
+    fig = Figure(figsize=(8, 6), dpi=150)
+    FigureCanvasAgg(fig)
+    draw_surface(fig, X, Y, Z_masked, sheet_name)
+    out_path = os.path.join(out_dir, f"{sheet_name}.png")
+    fig.savefig(out_path, dpi=300, bbox_inches="tight")
+    return out_path
+
+# === 4. Command line ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interpolate, smooth and plot sin(theta) over (m_hi, lambda) per M_r.")
+    parser.add_argument("sheets", nargs="*", help=f"M_r to plot (default: {sheet_name})")
+    parser.add_argument("--all", action="store_true", help="every M_r in the results store / workbook")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="results store folder")
+    parser.add_argument("--excel", default="filtered_results.xlsx", help="workbook used for M_r missing from the store")
+    parser.add_argument("--out-dir", default=".", help="folder for the <M_r>.png files")
+    parser.add_argument("--grid-size", type=int, default=grid_size)
+    parser.add_argument("--smoothing-sigma", type=float, default=smoothing_sigma)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes in batch mode")
+    parser.add_argument("--no-show", action="store_true", help="only save the PNGs (implied for several M_r)")
+    args = parser.parse_args(argv)
+
+    sheets = all_sheets(args.store, args.excel) if args.all else (args.sheets or [sheet_name])
+    if not sheets:
+        parser.error("no filtered results found")
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    if len(sheets) == 1 and not args.no_show:
+        # Interactive: surface and raw points in windows, the surface also saved
+        name = sheets[0]
+        X, Y, Z_masked, df_clean = make_surface(load_sheet(name, args.store, args.excel), args.grid_size, args.smoothing_sigma)
+        fig1 = plt.figure(figsize=(8, 6), dpi=150)
+        draw_surface(fig1, X, Y, Z_masked, name)
+        fig2 = plt.figure()
+        draw_points(fig2, df_clean, name)
+
+        out_path = os.path.join(args.out_dir, f"{name}.png")
+        fig1.savefig(out_path, dpi=300, bbox_inches="tight")
+        print(f"Saved plot: {out_path}")
+        plt.show()
+        return 0
+
+    started = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(sheets)))) as pool:
+        futures = {pool.submit(render_sheet, name, args.out_dir, args.store, args.excel,
+                               args.grid_size, args.smoothing_sigma): name for name in sheets}
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                out_path = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(sheets)}] M_r = {name}: failed ({e})")
+                continue
+            print(f"[{done}/{len(sheets)}] M_r = {name}: {out_path}")
+    print(f"Rendered {len(sheets) - failed} surfaces in {time.perf_counter() - started:.2f} s, {failed} failed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
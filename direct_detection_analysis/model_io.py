@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Reading of the CompHEP grid files of a direct-detection scan.
+# Every <m_hi>.txt in an M_r folder holds whitespace-separated columns: lambda, sin(theta),
+# sigma_model. Files are parsed by the pandas C reader straight into float64 columns;
+# "nan"/"-nan" cross sections become NaN (masked), rows with fewer than three numbers too.
+
+COLUMNS = ["lambda", "sin", "sigma_model"]
+NAN_VALUES = ["nan", "-nan", "NaN", "-NaN", "NAN", "-NAN"]
+READ_OPTIONS = dict(sep=r"\s+", header=None, names=COLUMNS, usecols=[0, 1, 2], index_col=False,
+                    na_values=NAN_VALUES, keep_default_na=False)
+
+# === 1. Single file ===
+def mass_from_filename(filename):
+    if not filename.endswith(".txt"):
+        return None
+    try:
+        return float(filename[:-len(".txt")])
+    except ValueError:
+        return None
+
+def parse_line(line):
+    values = [np.nan, np.nan, np.nan]
+    for i, part in enumerate(line.split()[:3]):
+        try:
+            values[i] = float(part)
+        except ValueError:
+            pass
+    return values
+
+def iter_text_chunks(path, chunk_rows, skip_rows=0):
+    # Slow path for malformed files (short rows, stray text): one line at a time,
+    # unparsable numbers become NaN. Blank lines are not rows, as in the C reader.
+    rows = []
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if skip_rows:
+                skip_rows -= 1
+                continue
+            rows.append(parse_line(line))
+            if len(rows) == chunk_rows:
+                yield pd.DataFrame(rows, columns=COLUMNS, dtype=np.float64)
+                rows = []
+    if rows:
+        yield pd.DataFrame(rows, columns=COLUMNS, dtype=np.float64)
+
+def read_model_file(path):
+    try:
+        return pd.read_csv(path, dtype=np.float64, **READ_OPTIONS)
+    except ValueError:
+        chunks = list(iter_text_chunks(path, 100_000))
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=COLUMNS, dtype=np.float64)
+
+def iter_model_chunks(path, chunk_rows):
+    # Same rows as read_model_file, at most chunk_rows at a time
+    done = 0
+    try:
+        with pd.read_csv(path, dtype=np.float64, chunksize=chunk_rows, **READ_OPTIONS) as reader:
+            for chunk in reader:
+                yield chunk
+                done += len(chunk)
+        return
+    except ValueError:
+        pass
+    # Malformed line: continue with the slow path after the rows already handed out
+    yield from iter_text_chunks(path, chunk_rows, skip_rows=done)
+
+# === 2. Whole M_r folder ===
+def list_model_files(input_folder):
+    files = []
+    for entry in os.scandir(input_folder):
+        m_val = mass_from_filename(entry.name)
+        if m_val is not None and entry.is_file():
+            files.append((m_val, entry.path))
+    return sorted(files)
+
+def read_model_folder(input_folder):
+    frames = []
+    for m_val, path in list_model_files(input_folder):
+        df = read_model_file(path).dropna()
+        df.insert(0, "m_hi", np.full(len(df), m_val))
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=["m_hi"] + COLUMNS, dtype=np.float64)
+    df_model = pd.concat(frames, ignore_index=True)
+    return df_model.sort_values(["m_hi", "lambda", "sin"]).reset_index(drop=True)
+
+# === 3. Dense (m_hi x lambda x sin) grid ===
+MAX_CELLS_PER_ROW = 2  # larger cubes (sparse / irregular scans) are left to the row-wise rule
+
+def to_dense(df_model):
+    # Returns (m_values, lambda_values, sin_values, sigma) with sigma[i, j, k] the cross
+    # section at (m_values[i], lambda_values[j], sin_values[k]), NaN where the scan has no
+    # point. Returns None if a (m_hi, lambda, sin) triple occurs more than once, or if the
+    # grid would have more than MAX_CELLS_PER_ROW cells per row of the scan.
+    axes, codes = [], []
+    for column in ["m_hi", "lambda", "sin"]:
+        inverse, values = pd.factorize(df_model[column], sort=True)
+        axes.append(np.asarray(values, dtype=np.float64))
+        codes.append(inverse)
+    shape = tuple(len(values) for values in axes)
+    if np.prod(shape, dtype=np.float64) > MAX_CELLS_PER_ROW * max(len(df_model), 1):
+        return None
+    flat = np.ravel_multi_index(codes, shape)
+    if not (np.diff(flat) > 0).all():  # read_model_folder's order makes flat increasing
+        if not np.diff(np.sort(flat)).all():
+            return None
+    sigma = np.full(shape, np.nan)
+    sigma.ravel()[flat] = df_model["sigma_model"].to_numpy()
+    return axes[0], axes[1], axes[2], sigma
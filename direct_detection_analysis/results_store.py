@@ -0,0 +1,163 @@
+import os
+import sys
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Filtered results, one file per M_r inside a store folder (default "filtered_results/"):
+#   filtered_results/150.npz, filtered_results/500.npz, ...
+# Writing one M_r replaces only its own file (temporary file + os.replace), so adding or
+# redoing a mediator mass never rewrites the others. Backends: NPZ (numpy only) and
+# Parquet / Feather (need pyarrow). Excel stays available as an explicit export:
+#
+#   python results_store.py export filtered_results --output filtered_results.xlsx
+#   python results_store.py import filtered_results.xlsx --store filtered_results
+
+COLUMNS = ["m_hi", "lambda", "sin"]
+DEFAULT_STORE = "filtered_results"
+
+# === 1. Backends ===
+class NpzBackend:
+    suffix = ".npz"
+
+    def save(self, path, df):
+        with open(path, "wb") as f:
+            np.savez(f, **{column: df[column].to_numpy(dtype=np.float64) for column in df.columns})
+
+    def load(self, path):
+        with np.load(path) as data:
+            return pd.DataFrame({column: data[column] for column in data.files})
+
+class ParquetBackend:
+    suffix = ".parquet"
+
+    def save(self, path, df):
+        df.to_parquet(path, index=False)
+
+    def load(self, path):
+        return pd.read_parquet(path)
+
+class FeatherBackend:
+    suffix = ".feather"
+
+    def save(self, path, df):
+        df.reset_index(drop=True).to_feather(path)
+
+    def load(self, path):
+        return pd.read_feather(path)
+
+BACKENDS = {"npz": NpzBackend, "parquet": ParquetBackend, "feather": FeatherBackend}
+
+def make_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown results format '{name}', expected one of: {', '.join(BACKENDS)}")
+    if name != "npz":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError(f"The '{name}' results format needs pyarrow (pip install pyarrow), or use 'npz'")
+    return BACKENDS[name]()
+
+# === 2. Store ===
+def key_order(key):
+    # Numeric M_r in numeric order, anything else after them
+    try:
+        return (0, float(key), key)
+    except ValueError:
+        return (1, 0.0, key)
+
+class ResultsStore:
+    def __init__(self, path=DEFAULT_STORE, backend=None):
+        self.path = Path(path)
+        self.backend = make_backend(backend or self.detect_backend())
+
+    def detect_backend(self):
+        # The format already used in the folder, NPZ for a new store
+        if self.path.is_dir():
+            for name, backend in BACKENDS.items():
+                if any(self.path.glob("*" + backend.suffix)):
+                    return name
+        return "npz"
+
+    def file_for(self, key):
+        return self.path / f"{key}{self.backend.suffix}"
+
+    def keys(self):
+        if not self.path.is_dir():
+            return []
+        suffix = self.backend.suffix
+        names = [p.name[:-len(suffix)] for p in self.path.iterdir() if p.name.endswith(suffix)]
+        return sorted(names, key=key_order)
+
+    def __contains__(self, key):
+        return self.file_for(key).exists()
+
+    def read(self, key):
+        return self.backend.load(self.file_for(key))
+
+    def read_all(self):
+        return {key: self.read(key) for key in self.keys()}
+
+    def write(self, key, df):
+        self.path.mkdir(parents=True, exist_ok=True)
+        path = self.file_for(key)
+        tmp_path = path.with_name(path.name + ".tmp")
+        self.backend.save(tmp_path, df[COLUMNS] if set(COLUMNS) <= set(df.columns) else df)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        try:
+            self.file_for(key).unlink()
+        except FileNotFoundError:
+            pass
+
+# === 3. Excel import / export ===
+def export_excel(store, output_file, keys=None):
+    # One sheet per M_r, written in a single pass; other sheets of the workbook are kept
+    output_path = Path(output_file)
+    if output_path.exists():
+        writer = pd.ExcelWriter(output_path, engine="openpyxl", mode="a", if_sheet_exists="replace")
+    else:
+        writer = pd.ExcelWriter(output_path, engine="openpyxl", mode="w")  # без if_sheet_exists!
+
+    with writer:
+        for key in (store.keys() if keys is None else keys):
+            store.read(key).to_excel(writer, sheet_name=key, index=False)
+
+def import_excel(store, input_file):
+    sheets = pd.read_excel(input_file, sheet_name=None)
+    for key, df in sheets.items():
+        store.write(key, df)
+    return list(sheets)
+
+# === 4. Command line ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert filtered results between the results store and Excel.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write the store to an Excel workbook")
+    export_parser.add_argument("store", nargs="?", default=DEFAULT_STORE)
+    export_parser.add_argument("--output", default="filtered_results.xlsx")
+    export_parser.add_argument("--key", action="append", help="only this M_r (repeatable)")
+    import_parser = commands.add_parser("import", help="load every sheet of an Excel workbook into the store")
+    import_parser.add_argument("workbook")
+    import_parser.add_argument("--store", default=DEFAULT_STORE)
+    import_parser.add_argument("--format", choices=list(BACKENDS), help="backend of a new store (default: npz)")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        store = ResultsStore(args.store)
+        keys = args.key or store.keys()
+        missing = [key for key in keys if key not in store]
+        if missing or not keys:
+            parser.error("no results for M_r: " + (", ".join(missing) or "(store is empty)"))
+        export_excel(store, args.output, keys)
+        print(f"Exported {len(keys)} sheets to '{args.output}'.")
+    else:
+        store = ResultsStore(args.store, args.format)
+        keys = import_excel(store, args.workbook)
+        print(f"Imported {len(keys)} sheets into '{args.store}'.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from model_io import to_dense, list_model_files, iter_model_chunks
+
+# Choice of one sin(theta) per (m_hi, lambda) pair from the points allowed by the experiment.
+# Among the points with sigma_model <= limit(m_hi): if there are more with sin > 0 than with
+# sin < 0, the largest positive sin is taken; otherwise, if any negative sin passed, the
+# magnitude of the most negative one; otherwise (or without a limit at this mass) 0.
+# sigma_limits(masses) must return the limit for an array of masses, NaN where undefined.
+#
+# The rule only needs four numbers per pair (passed positive / negative counts, largest
+# positive and smallest negative sin), and these combine across any split of the rows.
+# The streaming mode uses that to filter scans that do not fit in memory.
+
+AGGREGATES = {"n_positive": "sum", "n_negative": "sum", "max_positive": "max", "min_negative": "min"}
+
+# === 1. Vectorized rule on the dense grid ===
+def apply_rule(n_positive, n_negative, max_positive, min_negative):
+    chosen = np.where(n_negative > 0, np.abs(min_negative), 0.0)
+    return np.where((n_positive > 0) & (n_positive > n_negative), max_positive, chosen)
+
+def choose_sin_dense(sin_values, sigma, limits):
+    passed = sigma <= limits[:, None, None]  # NaN sigma or NaN limit never pass
+    positive = passed & (sin_values > 0)
+    negative = passed & (sin_values < 0)
+    n_positive = positive.sum(axis=2)
+    n_negative = negative.sum(axis=2)
+    max_positive = np.where(positive, sin_values, -np.inf).max(axis=2)
+    min_negative = np.where(negative, sin_values, np.inf).min(axis=2)
+    return apply_rule(n_positive, n_negative, max_positive, min_negative)
+
+# === 2. Reference per-group loop (scans with duplicate points) ===
+def choose_sin_groups(df_model, sigma_limits):
+    filtered_rows = []
+    for (m_val, lam_val), group in df_model.groupby(["m_hi", "lambda"]):
+        sigma_limit = sigma_limits(np.array([m_val]))[0]
+
+        if pd.isna(sigma_limit):
+            chosen_sin = 0.0
+        else:
+            passed = group[group["sigma_model"] <= sigma_limit]
+            positive = passed[passed["sin"] > 0]
+            negative = passed[passed["sin"] < 0]
+
+            if not positive.empty and len(positive) > len(negative):
+                chosen_sin = positive["sin"].max()
+            elif not negative.empty:
+                chosen_sin = abs(negative["sin"].min())
+            else:
+                chosen_sin = 0.0
+
+        filtered_rows.append({"m_hi": m_val, "lambda": lam_val, "sin": chosen_sin})
+    return pd.DataFrame(filtered_rows, columns=["m_hi", "lambda", "sin"])
+
+# === 3. Entry point ===
+def select_sin(df_model, sigma_limits):
+    dense = to_dense(df_model)
+    if dense is None:
+        df_filtered = choose_sin_groups(df_model, sigma_limits)
+    else:
+        m_values, lambda_values, sin_values, sigma = dense
+        chosen = choose_sin_dense(sin_values, sigma, sigma_limits(m_values))
+        present = ~np.isnan(sigma).all(axis=2)  # only pairs that occur in the scan
+        i, j = np.nonzero(present)
+        df_filtered = pd.DataFrame({"m_hi": m_values[i], "lambda": lambda_values[j], "sin": chosen[i, j]})
+    return df_filtered.sort_values(["m_hi", "lambda"]).reset_index(drop=True)
+
+# === 4. Streaming: one file / chunk of rows at a time ===
+def reduce_chunk(m_val, chunk, sigma_limit):
+    sin = chunk["sin"].to_numpy()
+    passed = chunk["sigma_model"].to_numpy() <= sigma_limit
+    positive = passed & (sin > 0)
+    negative = passed & (sin < 0)
+    parts = pd.DataFrame({"m_hi": np.full(len(chunk), m_val), "lambda": chunk["lambda"].to_numpy(),
+                          "n_positive": positive.astype(np.int64), "n_negative": negative.astype(np.int64),
+                          "max_positive": np.where(positive, sin, -np.inf),
+                          "min_negative": np.where(negative, sin, np.inf)})
+    return parts.groupby(["m_hi", "lambda"]).agg(AGGREGATES)
+
+def combine(partials):
+    return pd.concat(partials).groupby(level=["m_hi", "lambda"]).agg(AGGREGATES)
+
+def select_sin_streaming(input_folder, sigma_limits, chunk_rows=200_000):
+    # Peak memory is one chunk plus the per-(m_hi, lambda) counters, not the whole scan.
+    # m_hi is fixed within a file, so each file's chunks are combined once when the file is
+    # done and the finished files once at the end (not the running total per chunk).
+    per_file, n_rows = [], 0
+    for m_val, path in list_model_files(input_folder):
+        sigma_limit = sigma_limits(np.array([m_val]))[0]
+        partials = []
+        for chunk in iter_model_chunks(path, chunk_rows):
+            chunk = chunk.dropna()
+            n_rows += len(chunk)
+            partials.append(reduce_chunk(m_val, chunk, sigma_limit))
+        if partials:
+            per_file.append(combine(partials))
+    if not per_file:
+        return pd.DataFrame(columns=["m_hi", "lambda", "sin"], dtype=np.float64), n_rows
+    totals = combine(per_file)
+
+    chosen = apply_rule(totals["n_positive"].to_numpy(), totals["n_negative"].to_numpy(),
+                        totals["max_positive"].to_numpy(), totals["min_negative"].to_numpy())
+    df_filtered = pd.DataFrame({"m_hi": totals.index.get_level_values("m_hi"),
+                                "lambda": totals.index.get_level_values("lambda"), "sin": chosen})
+    return df_filtered.sort_values(["m_hi", "lambda"]).reset_index(drop=True), n_rows
@@ -0,0 +1,122 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy.spatial import Delaunay
+from scipy.interpolate import RegularGridInterpolator, CloughTocher2DInterpolator
+
+# Interpolation of sin(theta) over the (m_hi, lambda) plane.
+# Filtered results normally cover the full rectilinear m_hi x lambda grid; then a
+# tensor-product cubic interpolator is used and no triangulation is needed at all.
+# Nodes removed by the outlier cut are passed with a NaN value: on a grid they are filled
+# from their neighbours first, so the cut does not cost the fast path.
+# Scattered input goes through Clough-Tocher on the non-NaN points, exactly as
+# griddata(method='cubic'), but its Delaunay triangulation is cached by point set in
+# memory and in .interp_cache/, so other grid sizes, sheets and runs reuse it.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".interp_cache")
+
+# === 1. Rectilinear input ===
+def rectilinear_grid(points, values):
+    # (xs, ys, grid) with grid[i, j] at (xs[i], ys[j]) if every grid node occurs exactly once;
+    # NaN values (dropped nodes) are filled by fill_holes()
+    xs, ix = np.unique(points[:, 0], return_inverse=True)
+    ys, iy = np.unique(points[:, 1], return_inverse=True)
+    if len(xs) < 2 or len(ys) < 2 or len(points) != len(xs) * len(ys):
+        return None
+    counts = np.zeros((len(xs), len(ys)), dtype=np.int64)
+    np.add.at(counts, (ix, iy), 1)
+    if (counts != 1).any():
+        return None  # duplicated nodes leave others empty
+    grid = np.full((len(xs), len(ys)), np.nan)
+    grid[ix, iy] = values
+    grid = fill_holes(grid)
+    if grid is None:
+        return None
+    return xs, ys, grid
+
+def fill_holes(grid):
+    # Each NaN node takes the mean of its valid 4-neighbours, repeated inwards until the
+    # grid is full; None if there is no valid node at all
+    grid = grid.copy()
+    missing = np.isnan(grid)
+    if missing.all():
+        return None
+    while missing.any():
+        padded = np.pad(grid, 1, constant_values=np.nan)
+        neighbours = np.stack([padded[:-2, 1:-1], padded[2:, 1:-1], padded[1:-1, :-2], padded[1:-1, 2:]])
+        valid = ~np.isnan(neighbours)
+        count = valid.sum(axis=0)
+        mean = np.where(valid, neighbours, 0.0).sum(axis=0) / np.maximum(count, 1)
+        fill = missing & (count > 0)
+        grid[fill] = mean[fill]
+        missing &= ~fill
+    return grid
+
+# === 2. Triangulation cache for scattered input ===
+class TriangulationCache:
+    def __init__(self, cache_dir=None, max_entries=16):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def key(self, points):
+        points = np.ascontiguousarray(points, dtype=np.float64)
+        return hashlib.sha1(repr(points.shape).encode() + points.tobytes()).hexdigest()
+
+    def get(self, points):
+        key = self.key(points)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        tri = self.load(key)
+        if tri is None:
+            tri = Delaunay(points)
+            self.save(key, tri)
+
+        with self.lock:
+            self.entries[key] = tri
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return tri
+
+    def load(self, key):
+        try:
+            with open(os.path.join(self.cache_dir, key + ".pkl"), "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def save(self, key, tri):
+        path = os.path.join(self.cache_dir, key + ".pkl")
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump(tri, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass  # read-only location: keep the in-memory cache only
+
+triangulations = TriangulationCache()
+
+# === 3. Interpolation ===
+def interpolate_surface(points, values, X, Y, cache=None):
+    # Z on the (X, Y) mesh, NaN outside the data (as griddata); NaN values are dropped nodes
+    points = np.asarray(points, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    rect = rectilinear_grid(points, values)
+    if rect is not None:
+        xs, ys, grid = rect
+        method = "cubic" if min(len(xs), len(ys)) >= 4 else "linear"
+        interp = RegularGridInterpolator((xs, ys), grid, method=method, bounds_error=False, fill_value=np.nan)
+        return interp((X, Y))
+
+    keep = ~np.isnan(values)
+    points, values = points[keep], values[keep]
+    tri = (cache or triangulations).get(points)
+    return CloughTocher2DInterpolator(tri, values)((X, Y))
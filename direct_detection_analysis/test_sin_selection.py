@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import sin_selection
+from model_io import read_model_folder, to_dense
+
+# python -m unittest test_sin_selection   (from direct_detection_analysis/)
+
+def write_scan(folder, masses, seed=0):
+    rng = np.random.default_rng(seed)
+    lambdas = np.linspace(1000.0, 5000.0, 9)
+    sins = np.linspace(-0.5, 0.5, 11)
+    for m_val in masses:
+        lam, sin = (a.ravel() for a in np.meshgrid(lambdas, sins, indexing="ij"))
+        sigma = rng.uniform(0.0, 2.0, len(lam)) * 10.0 ** -(m_val / 100.0)
+        with open(os.path.join(folder, f"{m_val:g}.txt"), "w") as f:
+            for row in zip(lam, sin, sigma):
+                f.write("%g %g %.6e\n" % row)
+            f.write(f"{lambdas[0]:g} 0.1 nan\n")
+
+def sigma_limits(masses):
+    limits = 10.0 ** -(np.asarray(masses, dtype=float) / 100.0)
+    return np.where(np.asarray(masses) > 400, np.nan, limits)
+
+class StreamingTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        write_scan(self.tmp.name, [100, 150, 200, 500])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_result_does_not_depend_on_chunk_rows(self):
+        small, n_small = sin_selection.select_sin_streaming(self.tmp.name, sigma_limits, chunk_rows=7)
+        large, n_large = sin_selection.select_sin_streaming(self.tmp.name, sigma_limits, chunk_rows=200_000)
+        self.assertEqual(n_small, n_large)
+        pd.testing.assert_frame_equal(small, large)
+
+    def test_streaming_matches_in_memory(self):
+        streamed, n_rows = sin_selection.select_sin_streaming(self.tmp.name, sigma_limits, chunk_rows=7)
+        df_model = read_model_folder(self.tmp.name)
+        self.assertEqual(n_rows, len(df_model))
+        expected = sin_selection.select_sin(df_model, sigma_limits)
+        pd.testing.assert_frame_equal(streamed, expected, check_dtype=False)
+
+class DenseTest(unittest.TestCase):
+    def test_duplicates_and_sparse_scans_fall_back(self):
+        df_model = pd.DataFrame({"m_hi": [100.0, 100.0, 200.0], "lambda": [1000.0, 1000.0, 2000.0],
+                                 "sin": [0.1, 0.1, -0.2], "sigma_model": [1.0, 2.0, 3.0]})
+        self.assertIsNone(to_dense(df_model))
+        df_model = pd.DataFrame({"m_hi": np.arange(50.0), "lambda": np.arange(50.0), "sin": np.arange(50.0) / 100,
+                                 "sigma_model": np.full(50, 0.5)})
+        self.assertIsNone(to_dense(df_model))
+        limits = lambda masses: np.ones(len(masses))
+        pd.testing.assert_frame_equal(sin_selection.select_sin(df_model, limits),
+                                      sin_selection.choose_sin_groups(df_model, limits), check_dtype=False)
+
+if __name__ == "__main__":
+    unittest.main()